@@ -1,33 +1,18 @@
-import threading 
-from flask import Flask,jsonify,request
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
-app=Flask(__name__)
-inventory={
-    "product_1":{"nane":"sandeep","age":278},
-    "product_2":{"nane":"ajay","age":6378},
+"""
+Launcher for the inventory API the client is exercised against. The app and
+its tests live in lld_questions/api_router.py; this module only re-exports
+them, so there is one implementation.
+"""
 
-}
+from lld_questions.api_router import Inventory,app,inventory,main,serve,stock,valid_change
 
-lock=threading.Lock()
-@app.route('/products/<product_id>',methods=["GET"])
-def get_product(product_id):
-    if product_id in inventory:
-        return jsonify(inventory[product_id])
-    return jsonify({"error":"product not fond"}),400
+__all__=["Inventory","app","inventory","main","serve","stock","valid_change"]
 
 
-@app.route("/products/<product_id>/stocks",methods=["UPDATE"])
-def update(product_id):
-    data=request.get_json()
-    quantity_change=data["change"]
-    if product_id in inventory and isinstance(quantity_change):
-        with lock:
-            inventory[product_id]["age"]+=quantity_change
-            return jsonify({"message":"successful"})
-    else:
-        return jsonify({"error":"product not found"}),400
-    
-
 if __name__ == "__main__":
-    app.run(debug=True, host='0.0.0.0', port=5003)  # Run on all interfaces, port 5001
+    main()
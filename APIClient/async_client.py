@@ -0,0 +1,164 @@
+import aiohttp
+import asyncio
+import json
+import threading
+import time
+import unittest
+
+
+class AsyncAPIClient:
+    """
+    Coroutine version of APIClient.
+
+    One aiohttp session (and so one pool of kept-alive connections) is shared by
+    every call. At most `max_concurrency` requests are in flight at once; the
+    rest wait on a semaphore instead of opening more sockets, so one event loop
+    can drive hundreds of requests without a thread per request. The pool is
+    capped at the same size, and `limit_per_host` bounds any single host.
+
+        async with AsyncAPIClient(base_url,max_concurrency=200) as client:
+            posts=await client.get_resources('posts',ids)
+    """
+
+    def __init__(self,base_url,max_concurrency=100,limit_per_host=0,timeout=None):
+        self.base_url=base_url
+        self.max_concurrency=max_concurrency
+        self.limit_per_host=limit_per_host
+        self.timeout=aiohttp.ClientTimeout(total=timeout)
+        self.headers={
+            'Content-Type':'application/json',
+            'Accept':'application/json'
+        }
+        self._session=None
+        self._semaphore=None
+
+    def session(self):
+        # created on first use so it binds to the running loop
+        if self._session is None or self._session.closed:
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency,limit_per_host=self.limit_per_host)
+            self._session=aiohttp.ClientSession(connector=connector,headers=self.headers,timeout=self.timeout)
+            self._semaphore=asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def handle_response(self,response):
+        body=await response.read()
+        try:
+            response.raise_for_status()
+            return json.loads(body)
+        except aiohttp.ClientResponseError as e:
+            print("HTTP Error:{}".format(e))
+            print("Response text:{}".format(body.decode(errors='replace')))
+            raise
+        except ValueError:
+            print("Error occurred while json decodding")
+            return body.decode(errors='replace')
+
+    def url(self,endpoint,resource_id:str=None):
+        url=self.base_url+'/'+endpoint
+        if resource_id:
+            url=url+'/'+str(resource_id)
+        return url
+
+    async def request(self,method,url,**kwargs):
+        session=self.session()
+        async with self._semaphore:
+            async with session.request(method,url,**kwargs) as response:
+                return await self.handle_response(response)
+
+    async def create_resource(self,endpoint,data):
+        return await self.request('POST',self.url(endpoint),json=data)
+
+    async def get_resource(self,endpoint,resource_id:str=None):
+        return await self.request('GET',self.url(endpoint,resource_id))
+
+    async def delete_resource(self,endpoint,resource_id:str):
+        return await self.request('DELETE',self.url(endpoint,resource_id))
+
+    async def update_resource(self,endpoint,resource_id:str,data):
+        return await self.request('PUT',self.url(endpoint,resource_id),json=data)
+
+    async def patch_resource(self,endpoint,resource_id,data):
+        return await self.request('PATCH',self.url(endpoint,resource_id),json=data)
+
+    async def get_resources(self,endpoint,resource_ids,return_exceptions=False):
+        """Results in input order; see asyncio.gather for return_exceptions."""
+        return await asyncio.gather(*(self.get_resource(endpoint,resource_id) for resource_id in resource_ids),return_exceptions=return_exceptions)
+
+    async def create_resources(self,endpoint,items,return_exceptions=False):
+        return await asyncio.gather(*(self.create_resource(endpoint,data) for data in items),return_exceptions=return_exceptions)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self,exc_type,exc,tb):
+        await self.close()
+
+
+class TestAsyncAPIClient(unittest.TestCase):
+    def setUp(self):
+        from stand_in_server import StandInHandler,StandInServer
+
+        state=self.state={'in_flight':0,'max_in_flight':0}
+        lock=threading.Lock()
+
+        class Handler(StandInHandler):
+            def answer(self,status,payload,delay):
+                with lock:
+                    state['in_flight']+=1
+                    state['max_in_flight']=max(state['max_in_flight'],state['in_flight'])
+                try:
+                    time.sleep(delay)
+                finally:
+                    with lock:
+                        state['in_flight']-=1
+                self.send_json(status,payload)
+
+            def do_GET(self):
+                resource_id=self.path.rsplit('/',1)[-1]
+                if resource_id=='missing':
+                    self.answer(404,{'error':'not found'},0)
+                else:
+                    # later ids answer sooner, so responses arrive out of order
+                    self.answer(200,{'id':resource_id},0.05/(1+int(resource_id)))
+
+            def do_POST(self):
+                payload=json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                self.answer(201,payload,0.05/(1+payload['n']))
+
+        self.server=StandInServer(0,Handler,in_thread=True).__enter__()
+
+    def tearDown(self):
+        self.server.__exit__(None,None,None)
+
+    def run_client(self,work,max_concurrency=100):
+        async def run():
+            async with AsyncAPIClient(self.server.base_url,max_concurrency=max_concurrency,timeout=10) as client:
+                return await work(client)
+        return asyncio.run(run())
+
+    def testinputorder(self):
+        ids=[str(i) for i in range(10)]
+        posts=self.run_client(lambda client:client.get_resources('posts',ids))
+        self.assertEqual([post['id'] for post in posts],ids)
+        created=self.run_client(lambda client:client.create_resources('posts',[{'n':n} for n in range(10)]))
+        self.assertEqual(created,[{'n':n} for n in range(10)])
+
+    def testmaxconcurrency(self):
+        self.run_client(lambda client:client.get_resources('posts',['0']*12),max_concurrency=3)
+        self.assertEqual(self.state['max_in_flight'],3)
+
+    def testhttperrors(self):
+        with self.assertRaises(aiohttp.ClientResponseError) as caught:
+            self.run_client(lambda client:client.get_resource('posts','missing'))
+        self.assertEqual(caught.exception.status,404)
+        results=self.run_client(lambda client:client.get_resources('posts',['1','missing'],return_exceptions=True))
+        self.assertEqual(results[0],{'id':'1'})
+        self.assertIsInstance(results[1],aiohttp.ClientResponseError)
+
+
+if __name__ == '__main__':
+    unittest.main()
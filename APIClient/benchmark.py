@@ -0,0 +1,236 @@
+from main import APIClient
+from stand_in_server import StandInHandler,StandInServer
+from async_client import AsyncAPIClient
+from cache import ResponseCache
+from resilience import RetryPolicy,CircuitBreaker,CircuitOpen
+import random
+import tracemalloc
+from urllib.parse import urlsplit,parse_qs
+import asyncio
+import json
+import time
+
+
+"""
+run from the APIClient folder:
+    python3.8 benchmark.py
+
+Talks to a local stand-in server, so no network is needed.
+"""
+
+
+class ReferenceHandler(StandInHandler):
+    """Large, never changing resources with an ETag, revalidated on every use."""
+    cache_control="no-cache"
+    items=2000
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        resource_id=self.path.rstrip("/").rsplit("/",1)[-1]
+        etag='"{}-v1"'.format(resource_id)
+        if self.headers.get("If-None-Match")==etag:
+            self.send_response(304)
+            self.send_header("ETag",etag)
+            self.send_header("Cache-Control",self.cache_control)
+            self.send_header("Content-Length","0")
+            self.end_headers()
+            return
+        body=json.dumps({"id":resource_id,"items":[{"code":i,"label":"item {}".format(i)} for i in range(self.items)]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type","application/json")
+        self.send_header("Content-Length",str(len(body)))
+        self.send_header("ETag",etag)
+        self.send_header("Cache-Control",self.cache_control)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FreshReferenceHandler(ReferenceHandler):
+    cache_control="max-age=60"
+
+
+class FlakyHandler(StandInHandler):
+    """Answers 503 to a `failure_rate` share of GETs, sometimes with Retry-After."""
+    failure_rate=0.2
+
+    def do_GET(self):
+        if random.random()<self.failure_rate:
+            time.sleep(self.delay)
+            self.send_response(503)
+            if random.random()<0.5:
+                self.send_header("Retry-After","0")
+            self.send_header("Content-Length","0")
+            self.end_headers()
+            return
+        super().do_GET()
+
+
+class DownHandler(StandInHandler):
+    def do_GET(self):
+        time.sleep(self.delay)
+        self.send_response(503)
+        self.send_header("Content-Length","0")
+        self.end_headers()
+
+
+class PagedHandler(StandInHandler):
+    """
+    GET /items?cursor=N returns page N of `pages`, each {"items":[...], "next_cursor":...}.
+    Pages are prebuilt and sent in 64KB writes.
+    """
+    pages=4
+    page_items=50000
+    bodies={}
+
+    def page(self,cursor):
+        if cursor not in self.bodies:
+            items=[{"id":cursor*self.page_items+i,"name":"item {}".format(i),"tags":["a","b"]} for i in range(self.page_items)]
+            next_cursor=cursor+1 if cursor+1<self.pages else None
+            self.bodies[cursor]=json.dumps({"items":items,"next_cursor":next_cursor}).encode()
+        return self.bodies[cursor]
+
+    def do_GET(self):
+        query=parse_qs(urlsplit(self.path).query)
+        body=self.page(int(query.get("cursor",["0"])[0]))
+        time.sleep(self.delay)
+        self.send_response(200)
+        self.send_header("Content-Type","application/json")
+        self.send_header("Content-Length",str(len(body)))
+        self.end_headers()
+        for start in range(0,len(body),64*1024):
+            self.wfile.write(body[start:start+64*1024])
+
+
+def fetch_serial(client,ids):
+    return [client.get_resource("posts",resource_id) for resource_id in ids]
+
+
+def fetch_batch(client,ids):
+    return client.get_resources("posts",ids)
+
+
+def run_batch(resources=1000,delay=0.005):
+    ids=[str(i) for i in range(resources)]
+    print("GET {} resources, {}ms server latency".format(resources,delay*1000))
+    print("{:>8} {:>8} {:>10} {:>10}".format("mode","workers","seconds","req/sec"))
+    with StandInServer(delay) as server:
+        for mode,workers,fetch in (("serial",1,fetch_serial),("batch",4,fetch_batch),("batch",16,fetch_batch),("batch",64,fetch_batch)):
+            with APIClient(server.base_url,max_workers=workers) as client:
+                start=time.perf_counter()
+                results=fetch(client,ids)
+                elapsed=time.perf_counter()-start
+            assert [post["id"] for post in results]==ids
+            print("{:>8} {:>8} {:>10.3f} {:>10.0f}".format(mode,workers,elapsed,resources/elapsed))
+
+
+def run_async(resources=1000,delay=0.005):
+    ids=[str(i) for i in range(resources)]
+    print("GET {} resources on one event loop, {}ms server latency".format(resources,delay*1000))
+    print("{:>12} {:>10} {:>10}".format("concurrency","seconds","req/sec"))
+
+    async def fetch(base_url,concurrency):
+        async with AsyncAPIClient(base_url,max_concurrency=concurrency) as client:
+            start=time.perf_counter()
+            results=await client.get_resources("posts",ids)
+            return results,time.perf_counter()-start
+
+    with StandInServer(delay) as server:
+        for concurrency in (1,16,64,256):
+            results,elapsed=asyncio.run(fetch(server.base_url,concurrency))
+            assert [post["id"] for post in results]==ids
+            print("{:>12} {:>10.3f} {:>10.0f}".format(concurrency,elapsed,resources/elapsed))
+
+
+def run_cache(resources=20,reads=25,delay=0.005):
+    ids=[str(i) for i in range(resources)]*reads
+    print("GET {} reference resources {} times each, {}ms server latency".format(resources,reads,delay*1000))
+    print("{:>24} {:>10} {:>10}".format("mode","seconds","req/sec"))
+    for mode,handler,cache in (("no cache",ReferenceHandler,False),("revalidate (no-cache)",ReferenceHandler,True),("fresh (max-age=60)",FreshReferenceHandler,True)):
+        with StandInServer(delay,handler) as server:
+            with APIClient(server.base_url,max_workers=1,cache=ResponseCache() if cache else None) as client:
+                start=time.perf_counter()
+                results=[client.get_resource("posts",resource_id) for resource_id in ids]
+                elapsed=time.perf_counter()-start
+        assert [post["id"] for post in results]==ids
+        print("{:>24} {:>10.3f} {:>10.0f}".format(mode,elapsed,len(ids)/elapsed))
+
+
+def run_retries(resources=500,delay=0.005):
+    ids=[str(i) for i in range(resources)]
+    print("GET {} resources from a server failing 20% of requests with 503".format(resources))
+    print("{:>10} {:>10} {:>10} {:>10}".format("retry","ok","failed","retries"))
+    with StandInServer(delay,FlakyHandler) as server:
+        for mode,retry in (("off",None),("on",RetryPolicy(max_retries=5,backoff=0.01))):
+            with APIClient(server.base_url,max_workers=16,retry=retry,breaker=CircuitBreaker(failure_threshold=50)) as client:
+                results=client.get_resources("posts",ids,return_exceptions=True)
+                failed=sum(isinstance(result,Exception) for result in results)
+                print("{:>10} {:>10} {:>10} {:>10}".format(mode,resources-failed,failed,client.counters()["retries"]))
+    print()
+    print("GET {} resources from a server that is down".format(resources))
+    print("{:>10} {:>10} {:>12}".format("breaker","seconds","fast failed"))
+    with StandInServer(delay,DownHandler) as server:
+        for mode,breaker in (("off",CircuitBreaker(failure_threshold=10**9)),("on",CircuitBreaker(failure_threshold=5))):
+            with APIClient(server.base_url,max_workers=16,retry=RetryPolicy(max_retries=3,backoff=0.01),breaker=breaker) as client:
+                start=time.perf_counter()
+                results=client.get_resources("posts",ids,return_exceptions=True)
+                elapsed=time.perf_counter()-start
+            print("{:>10} {:>10.3f} {:>12}".format(mode,elapsed,sum(isinstance(result,CircuitOpen) for result in results)))
+
+
+def run_pagination(delay=0.005):
+    print("iterate {} pages of {} items".format(PagedHandler.pages,PagedHandler.page_items))
+    print("{:>10} {:>14} {:>10} {:>12}".format("mode","first item ms","seconds","peak MB"))
+    with StandInServer(delay,PagedHandler) as server:
+        for mode,stream in (("buffered",False),("stream",True)):
+            with APIClient(server.base_url) as client:
+                tracemalloc.start()
+                start=time.perf_counter()
+                first=None
+                count=0
+                for item in client.iter_resources("items",cursor_param="cursor",items_key="items",stream=stream):
+                    if first is None:
+                        first=time.perf_counter()-start
+                    count+=1
+                elapsed=time.perf_counter()-start
+                _,peak=tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            assert count==PagedHandler.pages*PagedHandler.page_items
+            print("{:>10} {:>14.1f} {:>10.3f} {:>12.1f}".format(mode,first*1000,elapsed,peak/2**20))
+
+
+def run_metrics(resources=1000,delay=0.005):
+    print("metrics after GET {} + POST {} resources with 16 workers".format(resources,resources//10))
+    with StandInServer(delay) as server:
+        with APIClient(server.base_url,max_workers=16) as client:
+            client.get_resources("posts",[str(i) for i in range(resources)])
+            client.create_resources("posts",[{"title":str(i)} for i in range(resources//10)])
+            snapshot=client.metrics_snapshot()
+            start=time.perf_counter()
+            for _ in range(100000):
+                client.metrics.record("GET overhead",0.001,100,100)
+            overhead=(time.perf_counter()-start)/100000
+    print("{:>12} {:>9} {:>9} {:>9} {:>9} {:>10}".format("endpoint","requests","p50 ms","p90 ms","p99 ms","bytes in"))
+    for key,stats in snapshot["endpoints"].items():
+        latency=stats["latency_ms"]
+        print("{:>12} {:>9} {:>9.2f} {:>9.2f} {:>9.2f} {:>10}".format(key,stats["requests"],latency["p50"],latency["p90"],latency["p99"],stats["bytes_in"]))
+    connections=snapshot["connections"]
+    print("connection reuse: {:.1%} ({} opened for {} requests)".format(connections["reuse_ratio"],connections["connections_opened"],connections["requests"]))
+    print("record overhead: {:.2f}us per request".format(overhead*1e6))
+
+
+def main():
+    run_batch()
+    print()
+    run_cache()
+    print()
+    run_retries()
+    print()
+    run_pagination()
+    print()
+    run_metrics()
+    print()
+    run_async()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+import hashlib
+import json
+import os
+import threading
+import time
+import unittest
+
+
+def parse_cache_control(value):
+    """'max-age=60, no-cache' -> {'max-age': '60', 'no-cache': None}"""
+    directives={}
+    for part in (value or '').split(','):
+        name,_,argument=part.strip().partition('=')
+        if name:
+            directives[name.lower()]=argument.strip('"') or None
+    return directives
+
+
+class CacheEntry:
+    __slots__=('url','data','size','etag','last_modified','expires_at')
+
+    def __init__(self,url,data,size,etag=None,last_modified=None,expires_at=0.0):
+        self.url=url
+        self.data=data
+        self.size=size
+        self.etag=etag
+        self.last_modified=last_modified
+        self.expires_at=expires_at
+
+    def fresh(self,now):
+        return now<self.expires_at
+
+    def validators(self):
+        headers={}
+        if self.etag:
+            headers['If-None-Match']=self.etag
+        if self.last_modified:
+            headers['If-Modified-Since']=self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    Decoded GET responses keyed by URL.
+
+    An entry is served without a request while its Cache-Control max-age lasts
+    (time.time based, so the disk tier survives restarts). After that the
+    client revalidates with If-None-Match / If-Modified-Since and a 304 reuses
+    the decoded value, skipping both the body and the JSON decode. Responses
+    marked no-store, or with neither a max-age nor a validator, are not kept.
+
+    The memory tier is an LRU bounded by `max_entries` and by `max_bytes` of
+    response body. With `directory` set, every entry is also written there and
+    memory misses fall back to it, so evicted or previous-run entries only cost
+    a decode. The disk tier is not size bounded.
+
+    Cached values are shared between callers: treat them as read only.
+    """
+
+    def __init__(self,max_entries=1024,max_bytes=64*1024*1024,directory=None,clock=time.time):
+        self.max_entries=max_entries
+        self.max_bytes=max_bytes
+        self.directory=directory
+        self.clock=clock
+        self.entries=OrderedDict()
+        self.size=0
+        self.lock=threading.Lock()
+        if directory is not None:
+            os.makedirs(directory,exist_ok=True)
+
+    def _path(self,url):
+        return os.path.join(self.directory,hashlib.sha256(url.encode()).hexdigest())
+
+    def _remember(self,entry):
+        # caller holds self.lock
+        old=self.entries.pop(entry.url,None)
+        if old is not None:
+            self.size-=old.size
+        if entry.size>self.max_bytes:
+            return
+        self.entries[entry.url]=entry
+        self.size+=entry.size
+        while len(self.entries)>self.max_entries or self.size>self.max_bytes:
+            _,evicted=self.entries.popitem(last=False)
+            self.size-=evicted.size
+
+    def _read_disk(self,url):
+        try:
+            with open(self._path(url),'rb') as f:
+                meta=json.loads(f.readline())
+                body=f.read()
+        except (OSError,ValueError):
+            return None
+        if meta.get('url')!=url:
+            return None
+        try:
+            data=json.loads(body)
+        except ValueError:
+            # a body that was not JSON; the client refetches and replaces it
+            return None
+        return CacheEntry(url,data,len(body),meta.get('etag'),meta.get('last_modified'),meta.get('expires_at',0.0))
+
+    def _write_disk(self,entry,body):
+        meta=json.dumps({'url':entry.url,'etag':entry.etag,'last_modified':entry.last_modified,'expires_at':entry.expires_at})
+        path=self._path(entry.url)
+        tmp='{}.{}.tmp'.format(path,threading.get_ident())
+        with open(tmp,'wb') as f:
+            f.write(meta.encode()+b'\n')
+            f.write(body)
+        os.replace(tmp,path)
+
+    def get(self,url):
+        with self.lock:
+            entry=self.entries.get(url)
+            if entry is not None:
+                self.entries.move_to_end(url)
+                return entry
+        if self.directory is None:
+            return None
+        entry=self._read_disk(url)
+        if entry is not None:
+            with self.lock:
+                self._remember(entry)
+        return entry
+
+    def expires_at(self,headers):
+        """Expiry time for a response, or None when it must not be stored."""
+        directives=parse_cache_control(headers.get('Cache-Control'))
+        if 'no-store' in directives:
+            return None
+        if 'no-cache' in directives:
+            return 0.0
+        # s-maxage is for shared caches only; this cache is private to one client
+        max_age=directives.get('max-age')
+        if max_age is not None:
+            try:
+                return self.clock()+int(max_age)-int(headers.get('Age') or 0)
+            except ValueError:
+                return 0.0
+        expires=headers.get('Expires')
+        if expires:
+            try:
+                return parsedate_to_datetime(expires).timestamp()
+            except (TypeError,ValueError):
+                return 0.0
+        return 0.0
+
+    def store(self,url,headers,body,data):
+        expires_at=self.expires_at(headers)
+        etag=headers.get('ETag')
+        last_modified=headers.get('Last-Modified')
+        if expires_at is None or (expires_at<=self.clock() and not etag and not last_modified):
+            self.invalidate(url)
+            return
+        entry=CacheEntry(url,data,len(body),etag,last_modified,expires_at)
+        with self.lock:
+            self._remember(entry)
+        if self.directory is not None:
+            self._write_disk(entry,body)
+
+    def refresh(self,entry,headers):
+        """Applies the headers of a 304 to `entry`."""
+        expires_at=self.expires_at(headers)
+        entry.expires_at=expires_at if expires_at is not None else 0.0
+        entry.etag=headers.get('ETag') or entry.etag
+        entry.last_modified=headers.get('Last-Modified') or entry.last_modified
+        if self.directory is not None:
+            try:
+                with open(self._path(entry.url),'rb') as f:
+                    f.readline()
+                    body=f.read()
+            except OSError:
+                return
+            self._write_disk(entry,body)
+
+    def invalidate(self,url):
+        with self.lock:
+            entry=self.entries.pop(url,None)
+            if entry is not None:
+                self.size-=entry.size
+        if self.directory is not None:
+            try:
+                os.remove(self._path(url))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size=0
+        if self.directory is not None:
+            for name in os.listdir(self.directory):
+                os.remove(os.path.join(self.directory,name))
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        from main import APIClient
+        from stand_in_server import StandInHandler,StandInServer
+        import tempfile
+
+        statuses=self.statuses=[]
+
+        class Handler(StandInHandler):
+            def do_DELETE(self):
+                self.send_json(200,{})
+
+            def do_GET(self):
+                resource_id=self.path.rsplit('/',1)[-1]
+                etag='"{}-v1"'.format(resource_id)
+                cache_control='max-age=60' if resource_id=='fresh' else 'no-cache'
+                if self.headers.get('If-None-Match')==etag:
+                    statuses.append(304)
+                    self.send_response(304)
+                    self.send_header('ETag',etag)
+                    self.send_header('Cache-Control',cache_control)
+                    self.send_header('Content-Length','0')
+                    self.end_headers()
+                    return
+                statuses.append(200)
+                body=b'plain text' if resource_id=='text' else json.dumps({'id':resource_id}).encode()
+                self.send_response(200)
+                self.send_header('ETag',etag)
+                self.send_header('Cache-Control',cache_control)
+                self.send_header('Content-Length',str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server=StandInServer(0,Handler,in_thread=True).__enter__()
+        self.directory=tempfile.mkdtemp()
+        self.client=lambda cache:APIClient(self.server.base_url,cache=cache)
+
+    def tearDown(self):
+        import shutil
+        self.server.__exit__(None,None,None)
+        shutil.rmtree(self.directory)
+
+    def testrevalidation(self):
+        client=self.client(ResponseCache())
+        first=client.get_resource('posts','1')
+        self.assertIs(client.get_resource('posts','1'),first)
+        self.assertEqual(self.statuses,[200,304])
+        client.delete_resource('posts','1')
+        client.get_resource('posts','1')
+        self.assertEqual(self.statuses[-1],200)
+
+    def testfreshentryskipsrequest(self):
+        client=self.client(ResponseCache())
+        client.get_resource('posts','fresh')
+        client.get_resource('posts','fresh')
+        self.assertEqual(self.statuses,[200])
+
+    def testdisktier(self):
+        self.client(ResponseCache(directory=self.directory)).get_resource('posts','1')
+        client=self.client(ResponseCache(directory=self.directory))
+        self.assertEqual(client.get_resource('posts','1'),{'id':'1'})
+        self.assertEqual(self.statuses,[200,304])
+
+    def testnonjsonbodyondisk(self):
+        self.client(ResponseCache(directory=self.directory)).get_resource('posts','text')
+        client=self.client(ResponseCache(directory=self.directory))
+        self.assertEqual(client.get_resource('posts','text'),'plain text')
+
+    def testlrubounds(self):
+        cache=ResponseCache(max_entries=2,max_bytes=10)
+        headers={'ETag':'"x"'}
+        cache.store('a',headers,b'1234',1)
+        cache.store('b',headers,b'1234',2)
+        cache.get('a')
+        cache.store('c',headers,b'1234',3)
+        self.assertEqual(list(cache.entries),['a','c'])
+        cache.store('d',headers,b'12345678901',4)
+        self.assertNotIn('d',cache.entries)
+        cache.store('e',{'Cache-Control':'no-store','ETag':'"x"'},b'1',5)
+        self.assertIsNone(cache.get('e'))
+
+    def testexpiry(self):
+        cache=ResponseCache(clock=lambda:100.0)
+        self.assertEqual(cache.expires_at({'Cache-Control':'max-age=60','Age':'10'}),150.0)
+        self.assertEqual(cache.expires_at({'Cache-Control':'s-maxage=600, max-age=60'}),160.0)
+        self.assertEqual(cache.expires_at({'Cache-Control':'s-maxage=600'}),0.0)
+        self.assertIsNone(cache.expires_at({'Cache-Control':'no-store'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,17 +1,59 @@
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from resilience import RetryPolicy,CircuitBreaker
+from metrics import RequestMetrics,connection_stats,dump
+from streaming import iter_json_items
+from urllib.parse import urlsplit
+import threading
+import time
+
+
+TRANSIENT_ERRORS=(requests.exceptions.ConnectionError,requests.exceptions.Timeout,requests.exceptions.ChunkedEncodingError)
 
 
 class APIClient:
-    def __init__(self,base_url):
+    """
+    JSON client over one requests.Session.
+
+    The session keeps `pool_connections` per-host pools of up to `pool_maxsize`
+    kept-alive connections each, so repeated calls (to any of those hosts) skip
+    the TCP/TLS handshake. The batch methods fan out over `max_workers` threads
+    sharing that session; pool_maxsize defaults to max_workers so no thread
+    waits for, or throws away, a connection.
+
+    With a cache.ResponseCache, get_resource serves fresh entries locally and
+    revalidates stale ones; writes through this client invalidate the URL.
+
+    Every request goes through send(), which retries transient failures under
+    `retry` (a resilience.RetryPolicy, None to disable) and consults
+    `breaker` (a resilience.CircuitBreaker, None for a default one) so an
+    unhealthy host fails fast instead of being hammered. Each attempt is timed
+    into `metrics` (a metrics.RequestMetrics) under "METHOD endpoint".
+    """
+
+    def __init__(self,base_url,max_workers=8,pool_connections=10,pool_maxsize=None,timeout=None,cache=None,retry=RetryPolicy(),breaker=None,metrics=None):
         self.base_url=base_url
+        self.cache=cache
+        self.retry=retry
+        self.breaker=breaker if breaker is not None else CircuitBreaker()
+        self.retries=0
+        self._countersLock=threading.Lock()
+        self.metrics=metrics if metrics is not None else RequestMetrics()
+        self.timeout=timeout
+        self.max_workers=max_workers
         self.session=requests.session()
+        self.adapter=HTTPAdapter(pool_connections=pool_connections,pool_maxsize=pool_maxsize or max_workers)
+        self.session.mount('http://',self.adapter)
+        self.session.mount('https://',self.adapter)
         self.session.headers.update(
             {
                 'Content-Type':'application/json',
                 'Accept':'application/json'
             }
         )
+        self._executor=None
+        self._executorLock=threading.Lock()
 
     def handle_response(self,response):
         try:
@@ -21,37 +63,220 @@ class APIClient:
             print("HTTP Error:{}".format(e))
             print("Response text:{}".format(response.text))
             raise 
-        except json.JSONDecoderError:
+        except ValueError:
             print("Error occurred while json decodding")
             return response.text
     
-    def create_resource(self,endpoint,data):
-        url=self.base_url+'/'+endpoint 
-        response=self.session.post(url,json=data)
+    def url(self,endpoint,resource_id:str=None):
+        url=self.base_url+'/'+endpoint
+        if resource_id:
+            url=url+'/'+str(resource_id)
+        return url
+
+    def send(self,method,url,endpoint=None,**kwargs):
+        """
+        Sends a request, retrying transient failures, and returns the last
+        response. Raises CircuitOpen when the host's circuit is open.
+        """
+        parts=urlsplit(url)
+        host=parts.netloc
+        key='{} {}'.format(method,endpoint if endpoint is not None else parts.path)
+        attempt=0
+        while True:
+            if self.breaker is not None:
+                self.breaker.before(host)
+            start=time.perf_counter()
+            try:
+                response=self.session.request(method,url,timeout=self.timeout,**kwargs)
+                self.record(key,time.perf_counter()-start,response,kwargs.get('stream',False),attempt>0)
+            except BaseException as e:
+                # any failure must reach the breaker, or a failed probe would leave the circuit half open for good
+                if self.breaker is not None:
+                    self.breaker.record(host,False)
+                self.metrics.record(key,time.perf_counter()-start,error=True,retry=attempt>0)
+                if not isinstance(e,TRANSIENT_ERRORS) or self.retry is None or not self.retry.should_retry(method,attempt):
+                    raise
+                delay=self.retry.delay(attempt)
+            else:
+                failed=response.status_code>=500 or response.status_code==429
+                if self.breaker is not None:
+                    self.breaker.record(host,not failed)
+                if not failed or self.retry is None or not self.retry.should_retry(method,attempt,response.status_code):
+                    return response
+                delay=self.retry.delay(attempt,response.headers)
+                response.close()
+            with self._countersLock:
+                self.retries+=1
+            time.sleep(delay)
+            attempt+=1
+
+    def record(self,key,seconds,response,streamed,retry):
+        body=response.request.body
+        bytes_out=len(body) if isinstance(body,(bytes,str)) else 0
+        if streamed:
+            # the body has not been read yet
+            bytes_in=int(response.headers.get('Content-Length') or 0)
+        else:
+            bytes_in=len(response.content)
+        self.metrics.record(key,seconds,bytes_out,bytes_in,response.status_code>=400,retry)
+
+    def metrics_snapshot(self):
+        """Per-endpoint latency percentiles, sizes, errors and retries, plus connection reuse."""
+        return self.metrics.snapshot(connection_stats(self.adapter))
+
+    def dump_metrics(self,path):
+        dump(self.metrics_snapshot(),path)
+
+    def counters(self):
+        counters={'retries':self.retries}
+        if self.breaker is not None:
+            counters['circuits_opened']=self.breaker.opened
+            counters['circuit_rejections']=self.breaker.rejected
+            counters['open_circuits']=self.breaker.open_hosts()
+        return counters
+
+    def request(self,method,url,**kwargs):
+        response=self.send(method,url,**kwargs)
         return self.handle_response(response)
 
+    def create_resource(self,endpoint,data):
+        return self.request('POST',self.url(endpoint),endpoint=endpoint,json=data)
+
 
     def get_resource(self,endpoint,resource_id:str=None):
-        url=self.base_url+'/'+endpoint
-        if resource_id:
-            url=url + '/' + resource_id
-        response=self.session.get(url)
-        return self.handle_response(response)
+        url=self.url(endpoint,resource_id)
+        if self.cache is None:
+            return self.request('GET',url,endpoint=endpoint)
+        return self.cached_get(url,endpoint)
+
+    def cached_get(self,url,endpoint=None):
+        entry=self.cache.get(url)
+        if entry is not None and entry.fresh(self.cache.clock()):
+            return entry.data
+        headers=entry.validators() if entry is not None else None
+        response=self.send('GET',url,endpoint=endpoint,headers=headers)
+        if response.status_code==304 and entry is not None:
+            self.cache.refresh(entry,response.headers)
+            return entry.data
+        data=self.handle_response(response)
+        self.cache.store(url,response.headers,response.content,data)
+        return data
+
+    def iter_resources(self,endpoint,page_param=None,cursor_param=None,cursor_key='next_cursor',items_key=None,params=None,stream=False,chunk_size=64*1024):
+        """
+        Yields every item of a paginated list endpoint, one page at a time.
+
+        A page is either a JSON array or an object holding the array under
+        `items_key`. The next page is found from, in order: a Link rel="next"
+        header; the `cursor_key` member of the page, sent back as
+        `cursor_param`; or, with `page_param`, the page number plus one, until
+        a page comes back empty.
+
+        With stream=True each page is decoded while it downloads, so the first
+        item arrives before the body is complete and memory stays at about one
+        chunk instead of the whole page. Stream mode bypasses the response cache.
+        """
+        url=self.url(endpoint)
+        params=dict(params or {})
+        if page_param is not None:
+            params.setdefault(page_param,1)
+        following_links=False
+        while url:
+            meta={}
+            count=0
+            if stream:
+                response=self.send('GET',url,endpoint=endpoint,params=params,stream=True)
+                with response:
+                    if not response.ok:
+                        self.handle_response(response)
+                    for item in iter_json_items(response.iter_content(chunk_size),items_key,meta):
+                        count+=1
+                        yield item
+            else:
+                response=self.send('GET',url,endpoint=endpoint,params=params)
+                body=self.handle_response(response)
+                if isinstance(body,dict) and items_key is not None:
+                    items=body.pop(items_key,[])
+                    meta=body
+                else:
+                    items=body if isinstance(body,list) else [body]
+                for item in items:
+                    count+=1
+                    yield item
+            next_link=response.links.get('next',{}).get('url')
+            if next_link:
+                url,params=next_link,{}
+                following_links=True
+            elif following_links:
+                # the server paginates by Link header; no next link is the last page
+                url=None
+            elif cursor_param is not None and meta.get(cursor_key):
+                params[cursor_param]=meta[cursor_key]
+            elif page_param is not None and count:
+                params[page_param]=int(params[page_param])+1
+            else:
+                url=None
+
+    def write(self,method,url,**kwargs):
+        if self.cache is not None:
+            self.cache.invalidate(url)
+        return self.request(method,url,**kwargs)
 
     def delete_resource(self,endpoint,resource_id:str):
-        url=self.base_url+'/'+endpoint+'/'+resource_id 
-        response = self.session.delete(url)
-        return self.handle_response(response)
+        return self.write('DELETE',self.url(endpoint,resource_id),endpoint=endpoint)
 
     def update_resource(self,endpoint,resource_id:str,data):
-        url=self.base_url+'/'+endpoint+'/'+resource_id
-        response=self.session.put(url,json=data)
-        return self.handle_response(response)
+        return self.write('PUT',self.url(endpoint,resource_id),endpoint=endpoint,json=data)
 
     def patch_resource(self,endpoint,resource_id,data):
-        url=self.base_url+'/'+endpoint+'/'+resource_id
-        response=self.session.patch(url,json=data)
-        return self.handle_response(response)
+        return self.write('PATCH',self.url(endpoint,resource_id),endpoint=endpoint,json=data)
+
+    def executor(self):
+        if self._executor is None:
+            with self._executorLock:
+                if self._executor is None:
+                    self._executor=ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def map(self,function,*iterables,return_exceptions=False):
+        """
+        Runs function over the arguments on the worker threads and returns the
+        results in input order. The first failure is raised once every call has
+        finished, unless return_exceptions is set, in which case failures are
+        returned in place of their results.
+        """
+        futures=[self.executor().submit(function,*args) for args in zip(*iterables)]
+        results=[]
+        error=None
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                if not return_exceptions and error is None:
+                    error=e
+                results.append(e)
+        if error is not None:
+            raise error
+        return results
+
+    def get_resources(self,endpoint,resource_ids,return_exceptions=False):
+        resource_ids=list(resource_ids)
+        return self.map(self.get_resource,[endpoint]*len(resource_ids),resource_ids,return_exceptions=return_exceptions)
+
+    def create_resources(self,endpoint,items,return_exceptions=False):
+        items=list(items)
+        return self.map(self.create_resource,[endpoint]*len(items),items,return_exceptions=return_exceptions)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,exc_type,exc,tb):
+        self.close()
     
 
 def main():
@@ -80,6 +305,10 @@ def main():
     resp=api_client.patch_resource('posts','1',data)
     print(resp)
 
+    resp=api_client.get_resources('posts',['1','2','3'])
+    print([post['id'] for post in resp])
+    api_client.close()
+
     
     
     
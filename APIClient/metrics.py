@@ -0,0 +1,192 @@
+import json
+import math
+import threading
+import unittest
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed histogram: bucket i holds values in [low*growth**i, low*growth**(i+1)).
+
+    Recording is a log and a list increment, memory is fixed, and percentiles
+    are accurate to about half a bucket (±5% with the default growth of 1.1).
+    """
+
+    def __init__(self,low=1e-5,growth=1.1,buckets=220):
+        self.low=low
+        self.growth=growth
+        self.log_growth=math.log(growth)
+        self.counts=[0]*buckets
+        self.count=0
+        self.total=0.0
+        self.max=0.0
+
+    def record(self,value):
+        if value<=self.low:
+            index=0
+        else:
+            index=min(int(math.log(value/self.low)/self.log_growth),len(self.counts)-1)
+        self.counts[index]+=1
+        self.count+=1
+        self.total+=value
+        if value>self.max:
+            self.max=value
+
+    def percentile(self,p):
+        if not self.count:
+            return 0.0
+        rank=p/100.0*self.count
+        seen=0
+        for index,count in enumerate(self.counts):
+            seen+=count
+            if seen>=rank and count:
+                # geometric middle of the bucket, never above the largest value seen
+                return min(self.low*self.growth**(index+0.5),self.max)
+        return self.max
+
+
+class EndpointStats:
+    __slots__=('lock','latency','requests','errors','retries','bytes_in','bytes_out')
+
+    def __init__(self):
+        self.lock=threading.Lock()
+        self.latency=LatencyHistogram()
+        self.requests=0
+        self.errors=0
+        self.retries=0
+        self.bytes_in=0
+        self.bytes_out=0
+
+    def snapshot(self):
+        with self.lock:
+            latency=self.latency
+            return {
+                'requests':self.requests,
+                'errors':self.errors,
+                'retries':self.retries,
+                'bytes_in':self.bytes_in,
+                'bytes_out':self.bytes_out,
+                'latency_ms':{
+                    'p50':latency.percentile(50)*1000,
+                    'p90':latency.percentile(90)*1000,
+                    'p99':latency.percentile(99)*1000,
+                    'max':latency.max*1000,
+                    'mean':latency.total/latency.count*1000 if latency.count else 0.0,
+                },
+            }
+
+
+class RequestMetrics:
+    """
+    Per-endpoint request statistics for an APIClient.
+
+    Every attempt (retries included) is recorded under "METHOD endpoint" with
+    its latency up to the response headers, request and response body sizes,
+    and whether it failed. Each endpoint has its own lock, so threads calling
+    different endpoints do not contend.
+    """
+
+    def __init__(self):
+        self.endpoints={}
+        self.lock=threading.Lock()
+
+    def stats(self,key):
+        stats=self.endpoints.get(key)
+        if stats is None:
+            with self.lock:
+                stats=self.endpoints.setdefault(key,EndpointStats())
+        return stats
+
+    def record(self,key,seconds,bytes_out=0,bytes_in=0,error=False,retry=False):
+        stats=self.stats(key)
+        with stats.lock:
+            stats.latency.record(seconds)
+            stats.requests+=1
+            stats.bytes_out+=bytes_out
+            stats.bytes_in+=bytes_in
+            if error:
+                stats.errors+=1
+            if retry:
+                stats.retries+=1
+
+    def snapshot(self,connections=None):
+        snapshot={'endpoints':{key:stats.snapshot() for key,stats in list(self.endpoints.items())}}
+        if connections is not None:
+            snapshot['connections']=connections
+        return snapshot
+
+    def reset(self):
+        with self.lock:
+            self.endpoints={}
+
+
+def connection_stats(adapter):
+    """
+    New connections against requests sent over the adapter's live pools.
+    Pools evicted from the adapter (beyond pool_connections hosts) drop out.
+    """
+    opened=0
+    sent=0
+    pools=adapter.poolmanager.pools
+    for key in list(pools.keys()):
+        pool=pools.get(key)
+        if pool is None:
+            continue
+        opened+=pool.num_connections
+        sent+=pool.num_requests
+    return {
+        'requests':sent,
+        'connections_opened':opened,
+        'reuse_ratio':1-opened/sent if sent else 0.0,
+    }
+
+
+def dump(snapshot,path):
+    with open(path,'w') as f:
+        json.dump(snapshot,f,indent=2,sort_keys=True)
+
+
+class TestMetrics(unittest.TestCase):
+    def testpercentiles(self):
+        histogram=LatencyHistogram()
+        for ms in range(1,1001):
+            histogram.record(ms/1000)
+        for p in (50,90,99):
+            self.assertAlmostEqual(histogram.percentile(p),p/100,delta=p/100*0.06)
+        self.assertEqual(histogram.max,1.0)
+        self.assertEqual(LatencyHistogram().percentile(99),0.0)
+
+    def testclientsnapshot(self):
+        from main import APIClient
+        from stand_in_server import StandInHandler,StandInServer
+        import os
+        import tempfile
+
+        class Handler(StandInHandler):
+            def do_GET(self):
+                if self.path.endswith('/missing'):
+                    self.send_json(404,{})
+                else:
+                    self.send_json(200,{'id':self.path.rsplit('/',1)[-1]})
+
+        with StandInServer(0,Handler,in_thread=True) as server:
+            with APIClient(server.base_url,max_workers=2) as client:
+                client.get_resources('posts',[str(i) for i in range(20)])
+                client.create_resource('posts',{'title':'x'})
+                self.assertRaises(Exception,client.get_resource,'posts','missing')
+                snapshot=client.metrics_snapshot()
+                path=os.path.join(tempfile.mkdtemp(),'metrics.json')
+                client.dump_metrics(path)
+        gets=snapshot['endpoints']['GET posts']
+        self.assertEqual(gets['requests'],21)
+        self.assertEqual(gets['errors'],1)
+        self.assertEqual(gets['bytes_in'],sum(len(json.dumps({'id':str(i)})) for i in range(20))+2)
+        self.assertEqual(snapshot['endpoints']['POST posts']['bytes_out'],len(b'{"title": "x"}'))
+        self.assertEqual(snapshot['connections']['requests'],22)
+        self.assertLessEqual(snapshot['connections']['connections_opened'],2)
+        with open(path) as f:
+            self.assertEqual(json.load(f)['endpoints']['GET posts']['requests'],21)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,211 @@
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+import unittest
+
+
+IDEMPOTENT_METHODS=frozenset(('GET','HEAD','OPTIONS','PUT','DELETE'))
+
+
+class RetryPolicy:
+    """
+    When and how long to wait before retrying a request.
+
+    Connection errors, timeouts, cut off bodies and `retry_statuses` are
+    retried up to `max_retries` times, but only for `methods` (idempotent ones by default, so
+    a POST is never sent twice). The wait is full jitter exponential backoff,
+    uniform in [0, min(max_backoff, backoff*2**attempt)], which spreads clients
+    out instead of having them retry in lock step. A Retry-After header, in
+    seconds or as an HTTP date, replaces the backoff, capped at max_retry_after.
+    """
+
+    def __init__(self,max_retries=3,backoff=0.1,max_backoff=10.0,max_retry_after=60.0,retry_statuses=(429,502,503,504),methods=IDEMPOTENT_METHODS):
+        self.max_retries=max_retries
+        self.backoff=backoff
+        self.max_backoff=max_backoff
+        self.max_retry_after=max_retry_after
+        self.retry_statuses=frozenset(retry_statuses)
+        self.methods=frozenset(method.upper() for method in methods)
+
+    def should_retry(self,method,attempt,status=None):
+        if attempt>=self.max_retries or method.upper() not in self.methods:
+            return False
+        return status is None or status in self.retry_statuses
+
+    def retry_after(self,headers):
+        value=headers.get('Retry-After') if headers is not None else None
+        if not value:
+            return None
+        try:
+            seconds=float(value)
+        except ValueError:
+            try:
+                seconds=parsedate_to_datetime(value).timestamp()-time.time()
+            except (TypeError,ValueError):
+                return None
+        return min(max(seconds,0.0),self.max_retry_after)
+
+    def delay(self,attempt,headers=None):
+        retry_after=self.retry_after(headers)
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0,min(self.max_backoff,self.backoff*(2**attempt)))
+
+
+class CircuitOpen(Exception):
+    """Raised instead of sending a request to a host whose circuit is open."""
+
+    def __init__(self,host,retry_in):
+        super().__init__("circuit open for host:{} retry in:{:.1f}s".format(host,retry_in))
+        self.host=host
+        self.retry_in=retry_in
+
+
+class _Circuit:
+    __slots__=('failures','opened_at','probing')
+
+    def __init__(self):
+        self.failures=0
+        self.opened_at=None
+        self.probing=False
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker.
+
+    After `failure_threshold` consecutive failures (connection errors, 5xx,
+    429) a host's circuit opens and calls to it fail at once with CircuitOpen.
+    Once `reset_timeout` seconds have passed a single probe request is let
+    through: success closes the circuit, failure opens it for another
+    `reset_timeout`.
+    """
+
+    def __init__(self,failure_threshold=5,reset_timeout=30.0,clock=time.monotonic):
+        self.failure_threshold=failure_threshold
+        self.reset_timeout=reset_timeout
+        self.clock=clock
+        self.lock=threading.Lock()
+        self.circuits={}
+        self.opened=0
+        self.rejected=0
+
+    def before(self,host):
+        with self.lock:
+            circuit=self.circuits.get(host)
+            if circuit is None or circuit.opened_at is None:
+                return
+            retry_in=circuit.opened_at+self.reset_timeout-self.clock()
+            if retry_in>0 or circuit.probing:
+                self.rejected+=1
+                raise CircuitOpen(host,max(retry_in,0.0))
+            circuit.probing=True
+
+    def record(self,host,ok):
+        with self.lock:
+            circuit=self.circuits.get(host)
+            if ok:
+                if circuit is not None:
+                    del self.circuits[host]
+                return
+            if circuit is None:
+                circuit=self.circuits[host]=_Circuit()
+            circuit.failures+=1
+            if circuit.probing or (circuit.opened_at is None and circuit.failures>=self.failure_threshold):
+                circuit.opened_at=self.clock()
+                circuit.probing=False
+                self.opened+=1
+
+    def open_hosts(self):
+        with self.lock:
+            return [host for host,circuit in self.circuits.items() if circuit.opened_at is not None]
+
+
+class TestRetryAndBreaker(unittest.TestCase):
+    def setUp(self):
+        from main import APIClient
+        from stand_in_server import StandInHandler,StandInServer
+
+        failures=self.failures=[]
+
+        class Handler(StandInHandler):
+            def do_GET(self):
+                if failures:
+                    status,retry_after=failures.pop(0)
+                    self.send_response(status)
+                    if retry_after is not None:
+                        self.send_header('Retry-After',retry_after)
+                    self.send_header('Content-Length','0')
+                    self.end_headers()
+                    return
+                self.send_json(200,{'ok':True})
+
+            do_POST=do_GET
+
+        self.server=StandInServer(0,Handler,in_thread=True).__enter__()
+        self.now=[0.0]
+        self.breaker=CircuitBreaker(failure_threshold=2,reset_timeout=10,clock=lambda:self.now[0])
+        self.client=APIClient(self.server.base_url,retry=RetryPolicy(max_retries=3,backoff=0.001),breaker=self.breaker)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.__exit__(None,None,None)
+
+    def testretriestransientstatuses(self):
+        self.breaker.failure_threshold=5
+        self.failures.extend([(503,'0'),(429,None)])
+        self.assertEqual(self.client.get_resource('posts','1'),{'ok':True})
+        self.assertEqual(self.client.counters()['retries'],2)
+        self.assertEqual(self.breaker.open_hosts(),[])
+
+    def testpostisnotretried(self):
+        import requests
+        self.failures.append((503,None))
+        self.assertRaises(requests.exceptions.HTTPError,self.client.create_resource,'posts',{})
+        self.assertEqual(self.client.counters()['retries'],0)
+
+    def testbreakeropensandprobecloses(self):
+        self.client.retry=None
+        self.failures.extend([(503,None),(503,None)])
+        for _ in range(2):
+            self.assertRaises(Exception,self.client.get_resource,'posts','1')
+        self.assertRaises(CircuitOpen,self.client.get_resource,'posts','1')
+        self.now[0]=11
+        self.assertEqual(self.client.get_resource('posts','1'),{'ok':True})
+        self.assertEqual(self.breaker.open_hosts(),[])
+        self.assertEqual(self.client.counters()['circuit_rejections'],1)
+
+    def testfailedprobereopens(self):
+        import requests
+        self.client.retry=None
+        session_request=self.client.session.request
+        errors=[requests.exceptions.ContentDecodingError('bad gzip')]*3
+
+        def request(*args,**kwargs):
+            if errors:
+                raise errors.pop()
+            return session_request(*args,**kwargs)
+
+        self.client.session.request=request
+        for _ in range(2):
+            self.assertRaises(requests.exceptions.ContentDecodingError,self.client.get_resource,'posts','1')
+        self.now[0]=11
+        # the probe fails with an error that is not retried; the circuit must open again, not stay probing
+        self.assertRaises(requests.exceptions.ContentDecodingError,self.client.get_resource,'posts','1')
+        self.assertRaises(CircuitOpen,self.client.get_resource,'posts','1')
+        self.now[0]=22
+        self.assertEqual(self.client.get_resource('posts','1'),{'ok':True})
+
+    def testdelay(self):
+        policy=RetryPolicy(backoff=1,max_backoff=4,max_retry_after=30)
+        self.assertEqual(policy.delay(0,{'Retry-After':'7'}),7)
+        self.assertEqual(policy.delay(0,{'Retry-After':'100'}),30)
+        self.assertTrue(all(0<=policy.delay(attempt)<=4 for attempt in range(10)))
+        self.assertFalse(policy.should_retry('POST',0,503))
+        self.assertFalse(policy.should_retry('GET',3,503))
+        self.assertFalse(policy.should_retry('GET',0,404))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+from http.server import BaseHTTPRequestHandler,ThreadingHTTPServer
+import json
+import multiprocessing
+import threading
+import time
+
+
+"""
+Local HTTP server for the APIClient benchmark and tests. Subclass
+StandInHandler to change what it answers.
+"""
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections alive between requests
+    protocol_version="HTTP/1.1"
+    # headers and body go out in separate writes; without this every
+    # kept-alive request stalls on a delayed ACK
+    disable_nagle_algorithm=True
+    delay=0.002
+
+    def log_message(self,format,*args):
+        pass
+
+    def send_json(self,status,payload):
+        body=json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type","application/json")
+        self.send_header("Content-Length",str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        resource_id=self.path.rstrip("/").rsplit("/",1)[-1]
+        self.send_json(200,{"id":resource_id,"title":"post {}".format(resource_id)})
+
+    def do_POST(self):
+        length=int(self.headers.get("Content-Length",0))
+        payload=json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.delay)
+        self.send_json(201,payload)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads=True
+    # room for hundreds of concurrent connects without dropped SYNs
+    request_queue_size=1024
+
+
+def _serve(handler,delay,ports):
+    server=_Server(("127.0.0.1",0),type("Handler",(handler,),{"delay":delay}))
+    ports.put(server.server_port)
+    server.serve_forever()
+
+
+class StandInServer:
+    """
+    Threaded local HTTP server answering every request after `delay` seconds.
+    It runs in its own process so it does not compete with the client for the
+    GIL; with in_thread=True (for tests) it runs on a thread of this process
+    instead, so the test can look at state the handler keeps.
+    """
+
+    def __init__(self,delay=0.005,handler=StandInHandler,in_thread=False):
+        self.delay=delay
+        self.handler=handler
+        self.in_thread=in_thread
+        self.process=None
+        self.server=None
+        self.base_url=None
+
+    def __enter__(self):
+        if self.in_thread:
+            self.server=_Server(("127.0.0.1",0),type("Handler",(self.handler,),{"delay":self.delay}))
+            threading.Thread(target=self.server.serve_forever,daemon=True).start()
+            self.base_url="http://127.0.0.1:{}".format(self.server.server_port)
+            return self
+        ports=multiprocessing.Queue()
+        self.process=multiprocessing.Process(target=_serve,args=(self.handler,self.delay,ports),daemon=True)
+        self.process.start()
+        self.base_url="http://127.0.0.1:{}".format(ports.get(timeout=10))
+        return self
+
+    def __exit__(self,exc_type,exc,tb):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            return
+        self.process.terminate()
+        self.process.join()
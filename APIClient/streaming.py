@@ -0,0 +1,216 @@
+import codecs
+import json
+import re
+import unittest
+
+
+_WHITESPACE=re.compile(r'[ \t\n\r]*')
+_decoder=json.JSONDecoder()
+
+
+class JSONStream:
+    """
+    Incremental reader over a JSON document arriving as byte chunks.
+
+    Values are decoded with json.JSONDecoder.raw_decode as soon as their text is
+    complete, and consumed text is dropped, so memory stays at about one chunk
+    plus the value being decoded rather than the whole body.
+    """
+
+    def __init__(self,chunks):
+        self.chunks=iter(chunks)
+        self.text=codecs.getincrementaldecoder('utf-8')()
+        self.buffer=''
+        self.pos=0
+        self.done=False
+
+    def _fill(self):
+        if self.done:
+            return False
+        try:
+            chunk=next(self.chunks)
+        except StopIteration:
+            self.buffer+=self.text.decode(b'',final=True)
+            self.done=True
+            return False
+        if self.pos:
+            self.buffer=self.buffer[self.pos:]
+            self.pos=0
+        self.buffer+=self.text.decode(chunk)
+        return True
+
+    def peek(self):
+        while True:
+            self.pos=_WHITESPACE.match(self.buffer,self.pos).end()
+            if self.pos<len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError("unexpected end of JSON document")
+
+    def expect(self,char):
+        if self.peek()!=char:
+            raise ValueError("expected {!r} at {!r}".format(char,self.buffer[self.pos:self.pos+20]))
+        self.pos+=1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value,end=_decoder.raw_decode(self.buffer,self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # a number or literal at the end of the buffer may continue in the next chunk
+            if end<len(self.buffer) or not self._fill():
+                self.pos=end
+                return value
+
+    def document(self):
+        """Reads the rest of the body, then decodes it as one value, so it is parsed once rather than once per chunk."""
+        while self._fill():
+            pass
+        return self.value()
+
+    def array(self):
+        self.expect('[')
+        if self.peek()==']':
+            self.pos+=1
+            return
+        while True:
+            yield self.value()
+            separator=self.peek()
+            self.pos+=1
+            if separator==']':
+                return
+            if separator!=',':
+                raise ValueError("expected ',' or ']' in array, got {!r}".format(separator))
+
+
+def iter_json_items(chunks,items_key=None,meta=None):
+    """
+    Yields the elements of a JSON array as they arrive.
+
+    The document is either the array itself or an object holding it under
+    `items_key`. The object's other members are decoded into `meta` (when
+    given), including ones that come after the array, e.g. a next page cursor;
+    they are complete once the generator is exhausted. Any other document is
+    read to the end and yielded as a single item.
+    """
+    stream=JSONStream(chunks)
+    first=stream.peek()
+    if first=='[':
+        yield from stream.array()
+    elif first=='{' and items_key is not None:
+        stream.pos+=1
+        if stream.peek()=='}':
+            return
+        while True:
+            key=stream.value()
+            stream.expect(':')
+            if key==items_key and stream.peek()=='[':
+                yield from stream.array()
+            else:
+                value=stream.value()
+                if meta is not None:
+                    meta[key]=value
+            separator=stream.peek()
+            stream.pos+=1
+            if separator=='}':
+                return
+            if separator!=',':
+                raise ValueError("expected ',' or '}}' in object, got {!r}".format(separator))
+    else:
+        yield stream.document()
+
+
+def _chunks(data,size):
+    return [data[start:start+size] for start in range(0,len(data),size)]
+
+
+class TestStreaming(unittest.TestCase):
+    def testsplitanywhere(self):
+        doc={'a':1,'items':[{'x':i,'s':'é'*i,'n':12345678901234567890*i} for i in range(50)],'next_cursor':'abc','z':[1,2]}
+        data=json.dumps(doc,ensure_ascii=False).encode()
+        for size in (1,2,7,64,len(data)):
+            meta={}
+            self.assertEqual(list(iter_json_items(_chunks(data,size),'items',meta)),doc['items'])
+            self.assertEqual(meta,{'a':1,'next_cursor':'abc','z':[1,2]})
+            self.assertEqual(list(iter_json_items(_chunks(data,size))),[doc])
+
+    def testbarearray(self):
+        data=b' [1, 22, 333, "x", null, true, [], {}] '
+        for size in (1,3,len(data)):
+            self.assertEqual(list(iter_json_items(_chunks(data,size))),[1,22,333,'x',None,True,[],{}])
+        self.assertEqual(list(iter_json_items([b'[',b']'])),[])
+
+    def testtruncated(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_items([b'[1,2,{"a":']))
+
+    def testmalformedobject(self):
+        with self.assertRaisesRegex(ValueError,"expected ',' or '}' in object"):
+            list(iter_json_items([b'{"a":1 "items":[]}'],'items'))
+
+    def testobjectwithoutitemskey(self):
+        doc={'data':['x'*100]*1000}
+        data=json.dumps(doc).encode()
+        decodes=[]
+        real_decode=_decoder.raw_decode
+
+        def raw_decode(text,pos):
+            decodes.append(pos)
+            return real_decode(text,pos)
+
+        _decoder.raw_decode=raw_decode
+        try:
+            self.assertEqual(list(iter_json_items(_chunks(data,64))),[doc])
+        finally:
+            del _decoder.raw_decode
+        # decoded once after the body is read, not retried on every chunk
+        self.assertEqual(len(decodes),1)
+
+
+class TestPagination(unittest.TestCase):
+    def setUp(self):
+        from main import APIClient
+        from stand_in_server import StandInHandler,StandInServer
+        from urllib.parse import urlsplit,parse_qs
+
+        class Handler(StandInHandler):
+            def do_GET(self):
+                parts=urlsplit(self.path)
+                query=parse_qs(parts.query)
+                page=int(query.get('page',['1'])[0])
+                if parts.path=='/pages':
+                    self.send_json(200,[page*10+i for i in range(2)] if page<=3 else [])
+                elif parts.path=='/cursor':
+                    cursor=int(query.get('cursor',['0'])[0])
+                    self.send_json(200,{'items':[cursor],'next_cursor':cursor+1 if cursor<2 else None})
+                else:
+                    body=json.dumps({'items':[page]}).encode()
+                    self.send_response(200)
+                    if page<3:
+                        self.send_header('Link','<http://{}/links?page={}>; rel="next"'.format(self.headers['Host'],page+1))
+                    self.send_header('Content-Length',str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+        self.server=StandInServer(0,Handler,in_thread=True).__enter__()
+        self.client=APIClient(self.server.base_url)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.__exit__(None,None,None)
+
+    def testpagination(self):
+        for stream in (False,True):
+            self.assertEqual(list(self.client.iter_resources('pages',page_param='page',stream=stream)),[10,11,20,21,30,31])
+            self.assertEqual(list(self.client.iter_resources('cursor',cursor_param='cursor',items_key='items',stream=stream)),[0,1,2])
+            self.assertEqual(list(self.client.iter_resources('links',items_key='items',stream=stream)),[1,2,3])
+            # Link headers win over page numbers, and their absence ends the iteration
+            self.assertEqual(list(self.client.iter_resources('links',page_param='page',items_key='items',stream=stream)),[1,2,3])
+
+
+if __name__ == '__main__':
+    unittest.main()
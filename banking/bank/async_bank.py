@@ -0,0 +1,95 @@
+from bank.bank import Bank
+from model.model import Transaction,TransactionType
+from datetime import datetime
+from queue import Full
+from typing import Dict,List,Optional,Tuple
+import asyncio
+import threading
+
+
+def _resolve(future:asyncio.Future,transaction:Transaction):
+    if not future.done():
+        future.set_result(transaction)
+
+
+class AsyncBank:
+    """
+    asyncio facade over Bank.
+
+    Storage writes run on the loop's default executor. Transactions are handed
+    to the TransactionManager workers without blocking: when the target queue
+    is full the coroutine sleeps and tries again (backing off from
+    `poll_interval` up to `max_poll_interval`), so a flood of clients slows
+    down instead of growing the queue or parking the event loop. Completion is
+    reported back from the worker thread with call_soon_threadsafe, so awaiting
+    a result costs no thread.
+    """
+
+    def __init__(self,bank:Optional[Bank]=None,poll_interval:float=0.001,max_poll_interval:float=0.05):
+        self.bank=bank if bank is not None else Bank()
+        self.poll_interval=poll_interval
+        self.max_poll_interval=max_poll_interval
+        self._pending:Dict[str,Tuple[asyncio.AbstractEventLoop,asyncio.Future]]={}
+        self._pendingLock=threading.Lock()
+        self.bank.transaction_manager.add_listener(self._on_done)
+
+    def _on_done(self,transaction:Transaction):
+        with self._pendingLock:
+            entry=self._pending.pop(transaction.transaction_id,None)
+        if entry is not None:
+            loop,future=entry
+            loop.call_soon_threadsafe(_resolve,future,transaction)
+
+    async def _run(self,function,*args):
+        loop=asyncio.get_event_loop()
+        return await loop.run_in_executor(None,function,*args)
+
+    async def _submit(self,transaction):
+        delay=self.poll_interval
+        while True:
+            try:
+                self.bank.transaction_manager.submit(transaction,block=False)
+                return
+            except Full:
+                await asyncio.sleep(delay)
+                delay=min(delay*2,self.max_poll_interval)
+
+    def _track(self,transaction:Transaction)->asyncio.Future:
+        loop=asyncio.get_event_loop()
+        future=loop.create_future()
+        with self._pendingLock:
+            self._pending[transaction.transaction_id]=(loop,future)
+        return future
+
+    def _untrack(self,transaction:Transaction):
+        with self._pendingLock:
+            self._pending.pop(transaction.transaction_id,None)
+
+    async def create_account(self,name,amount,dateTime:datetime):
+        await self._run(self.bank.create_account,name,amount,dateTime)
+
+    async def make_transaction(self,fromAccount:str,amount:int,transactiontype:TransactionType,to:str=None)->"asyncio.Future[Transaction]":
+        """
+        Queues a transaction and returns a future that resolves to it once its
+        status is COMPLETED or FAILED:
+
+            done=await (await bank.make_transaction(...))
+        """
+        transaction=await self._run(self.bank.record_transaction,fromAccount,amount,transactiontype,to)
+        future=self._track(transaction)
+        try:
+            await self._submit(transaction)
+        except BaseException:
+            self._untrack(transaction)
+            raise
+        return future
+
+    async def transact(self,fromAccount:str,amount:int,transactiontype:TransactionType,to:str=None)->Transaction:
+        """make_transaction, then wait for the outcome."""
+        return await (await self.make_transaction(fromAccount,amount,transactiontype,to))
+
+    async def get_statement(self,account_id:str,start:Optional[datetime]=None,end:Optional[datetime]=None)->List[Transaction]:
+        return await self._run(self.bank.get_statement,account_id,start,end)
+
+    async def shutdown(self):
+        await self._run(self.bank.shutdown)
@@ -1,23 +1,66 @@
 from storage.storage import InMemoryStorage
-from transaction.transaction_manager import TransactionManager
+from transaction.transaction_manager import TransactionManager,ConcurrencyMode
 from lockmanager.lockmanager import LockManager
 from model.model import Account,TransactionType,Transaction
 from datetime import datetime
-import random
+from typing import Iterable,List,Optional,Tuple
+import uuid
 
 
 class Bank:
-    def __init__(self):
-        self.storage=InMemoryStorage()
+    def __init__(self,workers:int=4,max_queue_size:int=10000,data_dir:Optional[str]=None,mode:ConcurrencyMode=ConcurrencyMode.PESSIMISTIC):
+        self.storage=InMemoryStorage(data_dir)
         self.lock_manager=LockManager()
-        self.transaction_manager=TransactionManager(self.storage,self.lock_manager)
+        self.transaction_manager=TransactionManager(self.storage,self.lock_manager,workers,max_queue_size,mode=mode)
 
     
     def create_account(self,name,amount,dateTime:datetime):
         account=Account(name,amount,dateTime)
         self.storage.save_account(account)
     
-    def make_transaction(self,fromAccount:Account,amount:int,transactiontype:TransactionType,to:Account=None):
-        transaction=Transaction(random.randint(1,1000),fromAccount,amount,Transaction)
-        self.transaction_manager.transaction_queue.put(transaction)
+    def record_transaction(self,fromAccount:str,amount:int,transactiontype:TransactionType,to:str=None)->Transaction:
+        """Creates and stores a PENDING transaction without queueing it."""
+        transaction=Transaction(str(uuid.uuid4()),transactiontype,fromAccount,amount,to)
+        self.storage.save_transactions(transaction)
+        return transaction
+
+    def record_transactions(self,batch:Iterable[Tuple[str,int,TransactionType,Optional[str]]])->List[Transaction]:
+        """record_transaction for many (fromAccount, amount, transactiontype, to) tuples, stored in one write."""
+        transactions=[]
+        for item in batch:
+            fromAccount,amount,transactiontype=item[:3]
+            to=item[3] if len(item)>3 else None
+            transactions.append(Transaction(str(uuid.uuid4()),transactiontype,fromAccount,amount,to))
+        self.storage.save_all_transactions(transactions)
+        return transactions
+
+    def make_transaction(self,fromAccount:str,amount:int,transactiontype:TransactionType,to:str=None)->Transaction:
+        transaction=self.record_transaction(fromAccount,amount,transactiontype,to)
+        self.transaction_manager.submit(transaction)
+        return transaction
+
+    def make_transactions(self,batch:Iterable[Tuple[str,int,TransactionType,Optional[str]]])->List[Transaction]:
+        """
+        Submits (fromAccount, amount, transactiontype, to) tuples as batches.
+
+        The batch is grouped by sender, keeping the original order inside each
+        group, and every group is applied with one lock acquisition and one
+        storage write per touched account.
+        """
+        groups={}
+        for transaction in self.record_transactions(batch):
+            groups.setdefault(transaction.account_id,[]).append(transaction)
+
+        transactions=[]
+        for fromAccount in sorted(groups):
+            self.transaction_manager.submit(groups[fromAccount])
+            transactions.extend(groups[fromAccount])
+        return transactions
+
+    def get_statement(self,account_id:str,start:Optional[datetime]=None,end:Optional[datetime]=None)->List[Transaction]:
+        return self.storage.get_statement(account_id,start,end)
+
+    def shutdown(self):
+        self.transaction_manager.shutdown()
+        self.storage.close()
 
@@ -0,0 +1,140 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from lockmanager.lockmanager import LockManager
+from model.model import Account,Transaction,TransactionType
+from storage.storage import InMemoryStorage
+from storage.transaction_table import TransactionTable
+from transaction.transaction_manager import TransactionManager,ConcurrencyMode
+from datetime import datetime
+import random
+import threading
+import time
+import tracemalloc
+import uuid
+
+
+"""
+Benchmarks for the banking package.
+
+run from the banking folder:
+    python3.8 benchmark.py
+"""
+
+
+def _transfer_worker(lock_manager:LockManager,account_ids,transfers:int,hold_seconds:float):
+    rng=random.Random()
+    for _ in range(transfers):
+        sender,recepient=rng.sample(account_ids,2)
+        with lock_manager.acquire_locks(sender,recepient):
+            # stands in for the storage round trip done while the locks are held
+            time.sleep(hold_seconds)
+
+
+def lock_contention(workers:int,stripes:int,accounts:int=1000,transfers:int=200,hold_seconds:float=0.0001)->float:
+    """Returns transfers per second for `workers` threads sharing one LockManager."""
+    lock_manager=LockManager(stripes)
+    account_ids=["account_{}".format(i) for i in range(accounts)]
+    threads=[
+        threading.Thread(target=_transfer_worker,args=(lock_manager,account_ids,transfers,hold_seconds))
+        for _ in range(workers)
+    ]
+    start=time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed=time.perf_counter()-start
+    return workers*transfers/elapsed
+
+
+def run_lock_contention():
+    print("lock contention (transfers/sec)")
+    print("{:>8} {:>14} {:>14}".format("workers","single lock","64 stripes"))
+    for workers in (1,4,16,64):
+        single=lock_contention(workers,stripes=1)
+        striped=lock_contention(workers,stripes=64)
+        print("{:>8} {:>14.0f} {:>14.0f}".format(workers,single,striped))
+
+
+def _sample_transactions(count:int,accounts:int):
+    types=list(TransactionType)
+    for i in range(count):
+        transactionType=types[i%len(types)]
+        recepient="account_{}".format((i+1)%accounts) if transactionType == TransactionType.TRANSFER else None
+        yield Transaction(str(uuid.uuid4()),transactionType,"account_{}".format(i%accounts),i%10000,recepient)
+
+
+def _traced_bytes(build)->int:
+    tracemalloc.start()
+    start,_=tracemalloc.get_traced_memory()
+    kept=build()
+    current,_=tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current-start
+
+
+def transaction_memory(count:int=200000,accounts:int=1000):
+    """Bytes held by `count` transactions as a dict of dataclasses vs a TransactionTable."""
+    def as_dict():
+        return {t.transaction_id:t for t in _sample_transactions(count,accounts)}
+
+    def as_table():
+        table=TransactionTable()
+        for t in _sample_transactions(count,accounts):
+            table.put(t)
+        return table
+
+    return _traced_bytes(as_dict),_traced_bytes(as_table)
+
+
+def run_transaction_memory():
+    count=200000
+    dict_bytes,table_bytes=transaction_memory(count)
+    print("transaction memory for {} rows".format(count))
+    print("dict of dataclasses: {:>8.1f} MB ({:.0f} bytes/row)".format(dict_bytes/1e6,dict_bytes/count))
+    print("TransactionTable:    {:>8.1f} MB ({:.0f} bytes/row)".format(table_bytes/1e6,table_bytes/count))
+    print("reduction:           {:>8.1f}x".format(dict_bytes/table_bytes))
+
+
+def transfer_throughput(mode:ConcurrencyMode,accounts:int,transfers:int=20000,workers:int=8)->dict:
+    """Runs random transfers between `accounts` accounts; fewer accounts means more contention."""
+    storage=InMemoryStorage()
+    for i in range(accounts):
+        storage.save_account(Account("account_{}".format(i),10**9,datetime.now()))
+    transaction_manager=TransactionManager(storage,LockManager(),workers,mode=mode)
+    rng=random.Random(7)
+    batch=[]
+    for _ in range(transfers):
+        sender,recepient=rng.sample(range(accounts),2)
+        batch.append(Transaction(str(uuid.uuid4()),TransactionType.TRANSFER,"account_{}".format(sender),1,"account_{}".format(recepient)))
+    start=time.perf_counter()
+    for transaction in batch:
+        transaction_manager.submit(transaction)
+    transaction_manager.shutdown()
+    elapsed=time.perf_counter()-start
+    metrics=transaction_manager.metrics()
+    return {"per_second":transfers/elapsed,"conflicts":metrics["conflicts"],"failed":metrics["failed"]}
+
+
+def run_concurrency_modes():
+    print("transfers/sec by contention (8 workers)")
+    print("{:>9} {:>12} {:>12} {:>10} {:>8}".format("accounts","pessimistic","optimistic","conflicts","winner"))
+    for accounts in (2,8,64,1024,65536):
+        pessimistic=transfer_throughput(ConcurrencyMode.PESSIMISTIC,accounts)
+        optimistic=transfer_throughput(ConcurrencyMode.OPTIMISTIC,accounts)
+        winner="opt" if optimistic["per_second"]>pessimistic["per_second"] else "pess"
+        print("{:>9} {:>12.0f} {:>12.0f} {:>10} {:>8}".format(
+            accounts,pessimistic["per_second"],optimistic["per_second"],optimistic["conflicts"],winner))
+
+
+def main():
+    run_lock_contention()
+    run_transaction_memory()
+    run_concurrency_modes()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,166 @@
 
-from threading import Lock
-from typing import Dict,List
+from threading import Condition,Lock
+from typing import Dict,Hashable,List,Optional,Set,Tuple,Union
 from model.model import Account
-from queue import Queue
+import time
 
-class LockManager:
 
+class DeadlockDetected(Exception):
+    """Raised in the transaction chosen as the victim of a wait-for cycle."""
+
+    def __init__(self,owner:Hashable,cycle:List[Hashable]):
+        super().__init__("deadlock between:{} aborted:{}".format(cycle,owner))
+        self.owner=owner
+        self.cycle=cycle
+
+
+class _Stripe:
     def __init__(self):
-        self.account_locks:Dict[str,Lock]={}
-        self.acquired_locks:Queue[str]=Queue()
-    
-    def acquire_locks(self,*accounts:Account):
-        for account in accounts:
-            self.account_locks[account.account_id].acquire()
-            self.acquire_locks.append(account.account_id)
-    
-    def release_locks(self):
-        while not self.acquired_locks.Empty():
-            account=self.acquire_locks.get()
-            self.account_locks[account.account_id].release()
\ No newline at end of file
+        self.condition=Condition(Lock())
+        self.owner:Optional[Hashable]=None
+
+
+class LockHandle:
+    """Locks taken by a single acquire_locks call, released in reverse order."""
+
+    def __init__(self,stripes:List[_Stripe]):
+        self._stripes=stripes
+        self._released=False
+
+    def release(self):
+        if self._released:
+            return
+        self._released=True
+        for stripe in reversed(self._stripes):
+            with stripe.condition:
+                stripe.owner=None
+                stripe.condition.notify()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,exc_type,exc,tb):
+        self.release()
+
+
+class LockManager:
+    """
+    Striped account locks with deadlock detection.
+
+    Every account id hashes to one of `stripes` slots. The state for a slot is
+    only created the first time an account in that slot is locked. By default
+    callers that need several accounts get their stripes in ascending order, so
+    they can never deadlock on each other.
+
+    Callers that pass ordered=False lock in the order given. For them the manager
+    keeps a wait-for graph: an owner that has to block records which stripe it
+    waits on, and since an owner waits on one stripe at a time, following
+    owner -> stripe -> holder finds a cycle in O(edges). The youngest owner in
+    the cycle (latest started_at) is aborted at once with DeadlockDetected
+    instead of waiting on a timeout.
+    """
+
+    def __init__(self,stripes:int=64):
+        if stripes<1:
+            raise ValueError("stripes must be >= 1, got:{}".format(stripes))
+        self.stripes=stripes
+        self._stripe_locks:List[Optional[_Stripe]]=[None]*stripes
+        self._allocation_lock=Lock()
+        self._graph_lock=Lock()
+        self._waits_for:Dict[Hashable,Tuple[_Stripe,float]]={}
+        self._aborted:Set[Hashable]=set()
+        self.cycles_detected=0
+
+    def stripe_of(self,account:Union[Account,str])->int:
+        account_id=account.account_id if isinstance(account,Account) else account
+        return hash(account_id)%self.stripes
+
+    def _stripe_lock(self,index:int)->_Stripe:
+        stripe=self._stripe_locks[index]
+        if stripe is None:
+            with self._allocation_lock:
+                stripe=self._stripe_locks[index]
+                if stripe is None:
+                    stripe=_Stripe()
+                    self._stripe_locks[index]=stripe
+        return stripe
+
+    def _find_cycle(self,owner:Hashable)->List[Hashable]:
+        # caller holds _graph_lock
+        path=[owner]
+        seen={owner}
+        node=owner
+        while True:
+            waiting=self._waits_for.get(node)
+            if waiting is None:
+                return []
+            holder=waiting[0].owner
+            if holder is None:
+                return []
+            if holder==owner:
+                return path
+            if holder in seen:
+                return []
+            path.append(holder)
+            seen.add(holder)
+            node=holder
+
+    def _acquire_stripe(self,stripe:_Stripe,owner:Hashable,started_at:float):
+        with stripe.condition:
+            if stripe.owner is None:
+                stripe.owner=owner
+                return
+
+        with self._graph_lock:
+            self._waits_for[owner]=(stripe,started_at)
+            cycle=self._find_cycle(owner)
+            if cycle:
+                self.cycles_detected+=1
+                victim=max(cycle,key=lambda node:self._waits_for[node][1])
+                if victim==owner:
+                    del self._waits_for[owner]
+                    raise DeadlockDetected(owner,cycle)
+                self._aborted.add(victim)
+                victim_stripe=self._waits_for[victim][0]
+                with victim_stripe.condition:
+                    victim_stripe.condition.notify_all()
+
+        try:
+            with stripe.condition:
+                while stripe.owner is not None:
+                    if owner in self._aborted:
+                        raise DeadlockDetected(owner,[owner,stripe.owner])
+                    stripe.condition.wait()
+                stripe.owner=owner
+        finally:
+            with self._graph_lock:
+                self._waits_for.pop(owner,None)
+                self._aborted.discard(owner)
+
+    def acquire_locks(self,*accounts:Union[Account,str],owner:Optional[Hashable]=None,started_at:Optional[float]=None,ordered:bool=True)->LockHandle:
+        """
+        Locks the stripes of `accounts` for `owner` (a fresh token if omitted).
+        `started_at` ages the owner for victim selection; keep it across retries
+        so a retried transaction is not picked again.
+        """
+        if owner is None:
+            owner=object()
+        if started_at is None:
+            started_at=time.monotonic()
+        if ordered:
+            indexes=sorted({self.stripe_of(account) for account in accounts})
+        else:
+            indexes=list(dict.fromkeys(self.stripe_of(account) for account in accounts))
+        stripes=[]
+        try:
+            for index in indexes:
+                stripe=self._stripe_lock(index)
+                self._acquire_stripe(stripe,owner,started_at)
+                stripes.append(stripe)
+        except BaseException:
+            LockHandle(stripes).release()
+            raise
+        return LockHandle(stripes)
+
+    def release_locks(self,handle:LockHandle):
+        handle.release()
@@ -63,6 +63,11 @@ def main():
     bank.create_account("ajay",100, datetime.now())
     print("accounts added")
     bank.make_transaction("sandeep",10,TransactionType.DEPOSIT)
+    bank.make_transaction("sandeep",50,TransactionType.TRANSFER,"ajay")
+    bank.make_transaction("ajay",500,TransactionType.WITHDRAW)
+    bank.shutdown()
+    print("sandeep:{} ajay:{}".format(bank.storage.get_account("sandeep").balance,bank.storage.get_account("ajay").balance))
+    print(bank.transaction_manager.metrics())
     
 
 if __name__ == "__main__":
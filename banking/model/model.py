@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass,field
 from datetime import datetime
 from typing import Optional
 from enum import Enum
@@ -18,6 +18,7 @@ class Account:
     account_id:str 
     balance:int 
     created_at:datetime 
+    version:int=0
 
 @dataclass
 class Transaction: 
@@ -26,3 +27,5 @@ class Transaction:
     account_id: str
     amount:int   
     receiptent_account_id:Optional[str]=None
+    status:TransactionStatus=TransactionStatus.PENDING
+    created_at:datetime=field(default_factory=datetime.now)
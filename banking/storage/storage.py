@@ -1,35 +1,315 @@
-from model.model import Account,Transaction
-from typing import List,Dict
+from model.model import Account,Transaction,TransactionType,TransactionStatus
+from storage.wal import WriteAheadLog,WriteAheadLogFailed,list_segments
+from storage.transaction_table import TransactionTable
+from typing import List,Dict,Optional,Tuple
 from threading import Lock
+from datetime import datetime
+from dataclasses import replace
+from array import array
+from bisect import bisect_left,bisect_right
+import json
+import os
+import pickle
+import re
+import threading
+
+
+_SNAPSHOT=re.compile(r"^snapshot-(\d+)\.pkl$")
+
+
+class VersionConflict(Exception):
+    """Raised when a conditional save finds the account at a different version."""
+
+    def __init__(self,account_id:str,expected_version:int,actual_version:Optional[int]):
+        super().__init__("account:{} expected version:{} found:{}".format(account_id,expected_version,actual_version))
+        self.account_id=account_id
+        self.expected_version=expected_version
+        self.actual_version=actual_version
+
+
+class NotDurable(Exception):
+    """
+    Raised when a write was applied (readers already see it) but its log record
+    could not be fsynced. A write the log refuses up front raises
+    WriteAheadLogFailed instead and is not applied at all.
+    """
+
+    def __init__(self,seq:int):
+        super().__init__("log record:{} applied but not durable".format(seq))
+        self.seq=seq
+
+
+def _encode_account(account:Account)->tuple:
+    return (account.account_id,account.balance,account.created_at.isoformat(),account.version)
+
+def _decode_account(row)->Account:
+    return Account(row[0],row[1],datetime.fromisoformat(row[2]),row[3] if len(row)>3 else 0)
+
+def _encode_transaction(transaction:Transaction)->tuple:
+    return (
+        transaction.transaction_id,
+        transaction.transactionType.value,
+        transaction.account_id,
+        transaction.amount,
+        transaction.receiptent_account_id,
+        transaction.status.value,
+        transaction.created_at.timestamp(),
+    )
+
+def _decode_transaction(row)->Transaction:
+    transaction=Transaction(row[0],TransactionType(row[1]),row[2],row[3],row[4],TransactionStatus(row[5]))
+    if len(row)>6:
+        transaction.created_at=datetime.fromtimestamp(row[6])
+    return transaction
+
+
+class _Ledger:
+    """One account's transactions as parallel arrays of creation time and table row, sorted by time."""
 
-class InMemoryStorage: 
     def __init__(self):
+        self.times=array("d")
+        self.rows=array("q")
+
+    def state(self)->Tuple[bytes,bytes]:
+        return self.times.tobytes(),self.rows.tobytes()
+
+    @classmethod
+    def from_state(cls,state:Tuple[bytes,bytes])->"_Ledger":
+        ledger=cls()
+        ledger.times.frombytes(state[0])
+        ledger.rows.frombytes(state[1])
+        return ledger
+
+    def add(self,created_at:float,row:int):
+        if not self.times or created_at>=self.times[-1]:
+            self.times.append(created_at)
+            self.rows.append(row)
+            return
+        position=bisect_right(self.times,created_at)
+        self.times.insert(position,created_at)
+        self.rows.insert(position,row)
+
+
+class InMemoryStorage:
+    """
+    Accounts kept in a dict, transactions in a column store (TransactionTable).
+    Every account also has a time ordered ledger of the rows it appears in, so
+    a statement for a time range is two binary searches and a slice.
+
+    Stored accounts are never mutated: every save stores a new record with the
+    version bumped by one. Readers therefore look records up without any lock
+    and always see a complete committed version. Callers must treat returned
+    accounts as read only and save a modified copy (dataclasses.replace).
+    Passing `expected_version` to save_account turns it into a compare-and-swap.
+
+    When `data_dir` is given every write is also appended to a write ahead log,
+    and a snapshot is taken every `snapshot_every` log records. A snapshot holds
+    the transaction columns, their index and the ledgers as raw array bytes, so
+    on start the newest one is loaded in bulk and only the log records after it
+    are replayed.
+    With `synchronous_commit` a save returns only once its log record is fsynced
+    (at most `flush_interval` seconds later, shared with every other writer).
+    """
+
+    def __init__(self,data_dir:Optional[str]=None,flush_interval:float=0.005,snapshot_every:int=100000,synchronous_commit:bool=True):
         self._accounts:Dict[str,Account] = {}
-        self._transactions:Dict[str,Transaction] = {}
+        self._transactions=TransactionTable()
+        self._ledgers:Dict[str,_Ledger]={}
         self._accountLock=Lock()
         self._transactionLock=Lock()
-    
-    def save_account(self,account:Account):
-        with self._accountLock:
-            self._accounts[account.account_id]=account 
-        
-    def get_account(self,account_id:str):
-        with self._accountLock:
-            return self._accounts[account_id]
-    
-    def save_account(self,account:Account):
+        self.data_dir=data_dir
+        self.snapshot_every=snapshot_every
+        self.synchronous_commit=synchronous_commit
+        self._wal:Optional[WriteAheadLog]=None
+        self._snapshotLock=Lock()
+        self._snapshot_seq=0
+        self._snapshot_thread:Optional[threading.Thread]=None
+        if data_dir is not None:
+            os.makedirs(data_dir,exist_ok=True)
+            self._snapshot_seq=self._recover()
+            self._wal=WriteAheadLog(data_dir,flush_interval,self._snapshot_seq+1)
+
+    def _snapshots(self)->List[tuple]:
+        found=[]
+        for name in os.listdir(self.data_dir):
+            match=_SNAPSHOT.match(name)
+            if match:
+                found.append((int(match.group(1)),os.path.join(self.data_dir,name)))
+        return sorted(found)
+
+    def _recover(self)->int:
+        snapshot_seq=0
+        snapshots=self._snapshots()
+        if snapshots:
+            snapshot_seq,path=snapshots[-1]
+            with open(path,"rb") as f:
+                data=pickle.load(f)
+            for row in data["accounts"]:
+                account=_decode_account(row)
+                self._accounts[account.account_id]=account
+            # columns, index and ledgers are loaded as raw arrays, not row by row
+            self._transactions=TransactionTable.from_state(data["transactions"])
+            self._ledgers={account_id:_Ledger.from_state(state) for account_id,state in data["ledgers"].items()}
+
+        for _,payload in WriteAheadLog.read(list_segments(self.data_dir),snapshot_seq):
+            kind,row=json.loads(payload)
+            if kind=="a":
+                account=_decode_account(row)
+                self._accounts[account.account_id]=account
+            elif kind=="A":
+                for account_row in row:
+                    account=_decode_account(account_row)
+                    self._accounts[account.account_id]=account
+            elif kind=="T":
+                for transaction_row in row:
+                    self._put_transaction(_decode_transaction(transaction_row))
+            else:
+                self._put_transaction(_decode_transaction(row))
+        return snapshot_seq
+
+    def _log(self,kind:str,row:object)->int:
+        return self._wal.append(json.dumps([kind,row],separators=(",",":")))
+
+    def _committed(self,seq:Optional[int]):
+        if seq is None:
+            return
+        if self.synchronous_commit:
+            try:
+                self._wal.wait_for(seq)
+            except WriteAheadLogFailed as e:
+                raise NotDurable(seq) from e
+        if seq-self._snapshot_seq>=self.snapshot_every:
+            self._start_snapshot()
+
+    def _start_snapshot(self):
+        with self._snapshotLock:
+            if self._snapshot_thread is not None and self._snapshot_thread.is_alive():
+                return
+            self._snapshot_thread=threading.Thread(target=self.snapshot,name="storage-snapshot",daemon=True)
+            self._snapshot_thread.start()
+
+    def snapshot(self):
+        """Writes a snapshot of the current state and drops the log segments it covers."""
+        if self._wal is None:
+            return
+        with self._accountLock,self._transactionLock:
+            first_seq=self._wal.rotate()
+            accounts=[_encode_account(a) for a in self._accounts.values()]
+            transactions=self._transactions.state()
+            ledgers={account_id:ledger.state() for account_id,ledger in self._ledgers.items()}
+        snapshot_seq=first_seq-1
+        path=os.path.join(self.data_dir,"snapshot-{:020d}.pkl".format(snapshot_seq))
+        tmp=path+".tmp"
+        with open(tmp,"wb") as f:
+            pickle.dump({"accounts":accounts,"transactions":transactions,"ledgers":ledgers},f,protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp,path)
+        self._snapshot_seq=snapshot_seq
+        for seq,old in self._snapshots():
+            if seq<snapshot_seq:
+                os.remove(old)
+        self._wal.truncate_before(first_seq)
+
+    def close(self):
+        if self._wal is None:
+            return
+        snapshot_thread=self._snapshot_thread
+        if snapshot_thread is not None:
+            snapshot_thread.join()
+        self._wal.close()
+
+    def save_account(self,account:Account,expected_version:Optional[int]=None)->Account:
+        return self.save_accounts([(account,expected_version)])[0]
+
+    def save_accounts(self,updates:List[Tuple[Account,Optional[int]]])->List[Account]:
+        """
+        Saves several accounts atomically, each optionally conditional on its
+        current version. Either every account is written (as one log record) or
+        VersionConflict is raised and nothing is. The log record is appended
+        before the accounts are published, so a log that is already failing
+        rejects the save; NotDurable means the save was applied but not fsynced.
+        """
+        seq=None
         with self._accountLock:
-            self._accounts[account.account_id]=account 
-    
+            currents=[]
+            for account,expected_version in updates:
+                current=self._accounts.get(account.account_id)
+                if expected_version is not None:
+                    actual_version=current.version if current is not None else None
+                    if actual_version!=expected_version:
+                        raise VersionConflict(account.account_id,expected_version,actual_version)
+                currents.append(current)
+            stored=[]
+            for (account,_),current in zip(updates,currents):
+                version=current.version+1 if current is not None else account.version
+                stored.append(replace(account,version=version))
+            if self._wal is not None:
+                if len(stored)==1:
+                    seq=self._log("a",_encode_account(stored[0]))
+                else:
+                    seq=self._log("A",[_encode_account(record) for record in stored])
+            for record in stored:
+                self._accounts[record.account_id]=record
+        self._committed(seq)
+        return stored
+
+    def get_account(self,account_id:str)->Account:
+        # a single dict lookup is atomic, and records are replaced rather than mutated
+        return self._accounts[account_id]
+
+    def _put_transaction(self,transaction:Transaction):
+        # caller holds _transactionLock (or is still recovering)
+        row,is_new=self._transactions.put(transaction)
+        if not is_new:
+            return
+        created_at=self._transactions.created_at(row)
+        for account_id in (transaction.account_id,transaction.receiptent_account_id):
+            if account_id is None:
+                continue
+            ledger=self._ledgers.get(account_id)
+            if ledger is None:
+                ledger=_Ledger()
+                self._ledgers[account_id]=ledger
+            ledger.add(created_at,row)
+
     def save_transactions(self,transaction:Transaction):
+        seq=None
+        with self._transactionLock:
+            if self._wal is not None:
+                seq=self._log("t",_encode_transaction(transaction))
+            self._put_transaction(transaction)
+        self._committed(seq)
+
+    def save_all_transactions(self,transactions:List[Transaction]):
+        """Saves several transactions as one log record, so a synchronous commit waits for one fsync."""
+        if not transactions:
+            return
+        seq=None
         with self._transactionLock:
-            self._transactions[transaction.transaction_id]=transaction 
-    
+            if self._wal is not None:
+                seq=self._log("T",[_encode_transaction(transaction) for transaction in transactions])
+            for transaction in transactions:
+                self._put_transaction(transaction)
+        self._committed(seq)
+
     def update_transactions(self,transaction:Transaction):
+        self.save_transactions(transaction)
+
+    def update_all_transactions(self,transactions:List[Transaction]):
+        self.save_all_transactions(transactions)
+
+    def get_transaction(self,transaction_id:str)->Transaction:
+        return self._transactions.get(transaction_id)
+
+    def get_statement(self,account_id:str,start:Optional[datetime]=None,end:Optional[datetime]=None)->List[Transaction]:
+        """Transactions sent or received by `account_id` with start <= created_at <= end, oldest first."""
         with self._transactionLock:
-            self._transactions[transaction.transaction_id]=transaction 
-    
-    def get_transaction(self,transaction_id:str):
-        with self._transactionsLock:
-            return self._transaction[transaction_id]
-    
+            ledger=self._ledgers.get(account_id)
+            if ledger is None:
+                return []
+            low=bisect_left(ledger.times,start.timestamp()) if start is not None else 0
+            high=bisect_right(ledger.times,end.timestamp()) if end is not None else len(ledger.times)
+            rows=ledger.rows[low:high]
+        return [self._transactions.at(row) for row in rows]
+
@@ -0,0 +1,207 @@
+from array import array
+from datetime import datetime
+from model.model import Transaction,TransactionType,TransactionStatus
+from typing import Dict,Iterator,List,Optional,Tuple
+import uuid
+
+
+_TYPE_CODES:Dict[TransactionType,int]={t:code for code,t in enumerate(TransactionType)}
+_TYPES:List[TransactionType]=list(TransactionType)
+_STATUS_CODES:Dict[TransactionStatus,int]={s:code for code,s in enumerate(TransactionStatus)}
+_STATUSES:List[TransactionStatus]=list(TransactionStatus)
+_NO_ACCOUNT=-1
+
+
+def _uuid_bytes(transaction_id:str)->Optional[bytes]:
+    """16 byte form of a canonical (lower case, hyphenated) uuid string, else None."""
+    if len(transaction_id)!=36:
+        return None
+    try:
+        parsed=uuid.UUID(transaction_id)
+    except ValueError:
+        return None
+    if str(parsed)!=transaction_id:
+        return None
+    return parsed.bytes
+
+
+class TransactionTable:
+    """
+    Column store for transactions.
+
+    Each field lives in its own typed array: enums as one byte codes, amounts as
+    64 bit integers (minor units), creation times as posix seconds and account
+    ids as indexes into a table of interned ids. Transaction ids that are canonical uuid strings are kept as 16
+    raw bytes and found through an open addressing index held in an array, so a
+    row costs a few dozen bytes instead of a dataclass, its __dict__, an id string
+    and a dict entry. Any other id is kept as a string on the side.
+
+    get() and values() hand back ordinary Transaction dataclasses built from the
+    row; changing one does nothing until it is put() back.
+
+    Writers must be serialised by the caller. Readers need no lock: a row's
+    columns are filled before it is published in the index.
+    """
+
+    def __init__(self):
+        self._size=0
+        self._index=array("q",bytes(8*16))
+        self._uuids=bytearray()
+        self._other_ids:Dict[int,str]={}
+        self._types=array("b")
+        self._statuses=array("b")
+        self._amounts=array("q")
+        self._created=array("d")
+        self._accounts=array("i")
+        self._recepients=array("i")
+        self._account_codes:Dict[str,int]={}
+        self._account_ids:List[str]=[]
+
+    def _account_code(self,account_id:Optional[str])->int:
+        if account_id is None:
+            return _NO_ACCOUNT
+        code=self._account_codes.get(account_id)
+        if code is None:
+            code=len(self._account_ids)
+            self._account_ids.append(account_id)
+            self._account_codes[account_id]=code
+        return code
+
+    def _hash(self,transaction_id:str,raw:Optional[bytes])->int:
+        if raw is not None:
+            return int.from_bytes(raw[:8],"little")
+        return hash(transaction_id)
+
+    def _matches(self,row:int,transaction_id:str,raw:Optional[bytes])->bool:
+        if raw is not None:
+            return row not in self._other_ids and self._uuids[16*row:16*row+16]==raw
+        return self._other_ids.get(row)==transaction_id
+
+    def _find(self,transaction_id:str,raw:Optional[bytes]):
+        """Returns (row or -1, slot where the id is or would be inserted)."""
+        index=self._index
+        mask=len(index)-1
+        slot=self._hash(transaction_id,raw)&mask
+        while True:
+            entry=index[slot]
+            if entry==0:
+                return -1,slot
+            if self._matches(entry-1,transaction_id,raw):
+                return entry-1,slot
+            slot=(slot+1)&mask
+
+    def _grow(self):
+        index=array("q",bytes(8*len(self._index)*2))
+        mask=len(index)-1
+        uuids=self._uuids
+        other_ids=self._other_ids
+        for row in range(self._size):
+            # same hash as _hash(), straight from the stored bytes
+            other=other_ids.get(row)
+            if other is None:
+                slot=int.from_bytes(uuids[16*row:16*row+8],"little")&mask
+            else:
+                slot=hash(other)&mask
+            while index[slot]!=0:
+                slot=(slot+1)&mask
+            index[slot]=row+1
+        self._index=index
+
+    def _id_at(self,row:int)->str:
+        other=self._other_ids.get(row)
+        if other is not None:
+            return other
+        return str(uuid.UUID(bytes=bytes(self._uuids[16*row:16*row+16])))
+
+    def put(self,transaction:Transaction)->Tuple[int,bool]:
+        """Stores a transaction and returns (row, whether the row is new)."""
+        raw=_uuid_bytes(transaction.transaction_id)
+        row,slot=self._find(transaction.transaction_id,raw)
+        if row>=0:
+            # only the status changes once a transaction has been recorded
+            self._statuses[row]=_STATUS_CODES[transaction.status]
+            return row,False
+        row=self._size
+        if raw is None:
+            self._other_ids[row]=transaction.transaction_id
+            raw=bytes(16)
+        self._uuids+=raw
+        self._types.append(_TYPE_CODES[transaction.transactionType])
+        self._statuses.append(_STATUS_CODES[transaction.status])
+        self._amounts.append(transaction.amount)
+        self._created.append(transaction.created_at.timestamp())
+        self._accounts.append(self._account_code(transaction.account_id))
+        self._recepients.append(self._account_code(transaction.receiptent_account_id))
+        self._index[slot]=row+1
+        self._size+=1
+        if 3*self._size>2*len(self._index):
+            self._grow()
+        return row,True
+
+    def _view(self,row:int)->Transaction:
+        recepient=self._recepients[row]
+        return Transaction(
+            self._id_at(row),
+            _TYPES[self._types[row]],
+            self._account_ids[self._accounts[row]],
+            self._amounts[row],
+            self._account_ids[recepient] if recepient!=_NO_ACCOUNT else None,
+            _STATUSES[self._statuses[row]],
+            datetime.fromtimestamp(self._created[row]),
+        )
+
+    def at(self,row:int)->Transaction:
+        return self._view(row)
+
+    def created_at(self,row:int)->float:
+        return self._created[row]
+
+    def get(self,transaction_id:str)->Transaction:
+        row,_=self._find(transaction_id,_uuid_bytes(transaction_id))
+        if row<0:
+            raise KeyError(transaction_id)
+        return self._view(row)
+
+    def __contains__(self,transaction_id:str)->bool:
+        row,_=self._find(transaction_id,_uuid_bytes(transaction_id))
+        return row>=0
+
+    def __len__(self)->int:
+        return self._size
+
+    def values(self)->Iterator[Transaction]:
+        for row in range(self._size):
+            yield self._view(row)
+
+    def state(self)->Dict[str,object]:
+        """Every column as raw bytes, for a snapshot. Take it while writers are held off."""
+        return {
+            "size":self._size,
+            "index":self._index.tobytes(),
+            "uuids":bytes(self._uuids),
+            "other_ids":dict(self._other_ids),
+            "types":self._types.tobytes(),
+            "statuses":self._statuses.tobytes(),
+            "amounts":self._amounts.tobytes(),
+            "created":self._created.tobytes(),
+            "accounts":self._accounts.tobytes(),
+            "recepients":self._recepients.tobytes(),
+            "account_ids":list(self._account_ids),
+        }
+
+    @classmethod
+    def from_state(cls,state:Dict[str,object])->"TransactionTable":
+        """Rebuilds a table from state() in bulk, index included, without touching a row."""
+        table=cls()
+        table._size=state["size"]
+        table._index=array("q")
+        table._index.frombytes(state["index"])
+        table._uuids=bytearray(state["uuids"])
+        table._other_ids=dict(state["other_ids"])
+        for name,typecode in (("types","b"),("statuses","b"),("amounts","q"),("created","d"),("accounts","i"),("recepients","i")):
+            column=array(typecode)
+            column.frombytes(state[name])
+            setattr(table,"_"+name,column)
+        table._account_ids=list(state["account_ids"])
+        table._account_codes={account_id:code for code,account_id in enumerate(table._account_ids)}
+        return table
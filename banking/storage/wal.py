@@ -0,0 +1,173 @@
+import os
+import re
+import threading
+from typing import Iterator,List,Optional,Tuple
+
+
+_SEGMENT=re.compile(r"^wal-(\d+)\.log$")
+
+
+class WriteAheadLogFailed(IOError):
+    """A write or fsync of the log failed; nothing appended since is durable."""
+
+
+def list_segments(directory:str)->List[Tuple[int,str]]:
+    """(first seq, path) of every log segment in `directory`, oldest first."""
+    found=[]
+    for name in os.listdir(directory):
+        match=_SEGMENT.match(name)
+        if match:
+            found.append((int(match.group(1)),os.path.join(directory,name)))
+    return sorted(found)
+
+
+class WriteAheadLog:
+    """
+    Append-only, group-committed log.
+
+    append() only buffers a line and hands back its sequence number. A flusher
+    thread wakes every `flush_interval` seconds, writes everything buffered so far
+    with one write() and one fsync(), and wakes whoever is waiting on those
+    sequence numbers. A larger interval means fewer fsyncs (more throughput) at
+    the cost of up to `flush_interval` extra latency per durable write.
+
+    The log is split into segments named after the first sequence number they
+    hold, so a snapshot can rotate the log and older segments can be deleted.
+    Every open starts a fresh segment, so a torn tail left by a crash is never
+    appended to.
+
+    If a write or fsync fails the log stops: the error is kept, every waiter is
+    woken, and append() and wait_for() raise WriteAheadLogFailed from then on,
+    since records buffered at the time can no longer be made durable.
+    """
+
+    def __init__(self,directory:str,flush_interval:float=0.005,min_next_seq:int=1):
+        self.directory=directory
+        self.flush_interval=flush_interval
+        os.makedirs(directory,exist_ok=True)
+        self._lock=threading.Lock()
+        self._io_lock=threading.Lock()
+        self._flushed=threading.Condition(self._lock)
+        self._buffer:List[str]=[]
+        self._error:Optional[BaseException]=None
+        self._next_seq=max(self._last_seq(self.segments())+1,min_next_seq)
+        self._durable_seq=self._next_seq-1
+        # a segment with this name can only hold a torn, unacknowledged tail
+        self._file=open(self._segment_path(self._next_seq),"w",encoding="utf-8")
+        self._stop=threading.Event()
+        self._flusher=threading.Thread(target=self._flush_loop,name="wal-flusher",daemon=True)
+        self._flusher.start()
+
+    def _segment_path(self,first_seq:int)->str:
+        return os.path.join(self.directory,"wal-{:020d}.log".format(first_seq))
+
+    def segments(self)->List[Tuple[int,str]]:
+        return list_segments(self.directory)
+
+    def _last_seq(self,segments:List[Tuple[int,str]])->int:
+        if not segments:
+            return 0
+        last=segments[-1][0]-1
+        for seq,_ in self.read(segments[-1:]):
+            last=seq
+        return last
+
+    @staticmethod
+    def read(segments:List[Tuple[int,str]],after_seq:int=0)->Iterator[Tuple[int,str]]:
+        """Yields (seq, payload) for every complete record with seq > after_seq."""
+        for _,path in segments:
+            with open(path,"r",encoding="utf-8") as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        # torn write from a crash mid-flush; it was never acknowledged
+                        break
+                    seq,_,payload=line.partition(" ")
+                    seq=int(seq)
+                    if seq>after_seq:
+                        yield seq,payload[:-1]
+
+    def _check(self):
+        # caller holds _lock
+        if self._error is not None:
+            raise WriteAheadLogFailed("write ahead log failed:{}".format(self._error)) from self._error
+
+    def append(self,payload:str)->int:
+        with self._lock:
+            self._check()
+            if self._stop.is_set():
+                raise RuntimeError("write ahead log is closed")
+            seq=self._next_seq
+            self._next_seq+=1
+            self._buffer.append("{} {}\n".format(seq,payload))
+            return seq
+
+    def wait_for(self,seq:int,timeout:Optional[float]=None)->bool:
+        """Blocks until `seq` has been fsynced. Returns False on timeout."""
+        with self._lock:
+            if self._flushed.wait_for(lambda:self._durable_seq>=seq or self._error is not None,timeout) and self._durable_seq<seq:
+                self._check()
+            return self._durable_seq>=seq
+
+    def _write_buffered(self)->int:
+        # caller holds _io_lock; appenders are only blocked while the buffer is swapped
+        with self._lock:
+            self._check()
+            lines="".join(self._buffer)
+            self._buffer=[]
+            upto=self._next_seq-1
+        if lines:
+            try:
+                self._file.write(lines)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except BaseException as e:
+                with self._lock:
+                    self._error=e
+                    self._flushed.notify_all()
+                raise
+        with self._lock:
+            self._durable_seq=upto
+            self._flushed.notify_all()
+        return upto
+
+    def flush(self):
+        with self._io_lock:
+            self._write_buffered()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                # kept in _error and raised to writers; nothing more can be made durable
+                return
+
+    def rotate(self)->int:
+        """Flushes, starts a new segment and returns its first sequence number."""
+        with self._io_lock:
+            first_seq=self._write_buffered()+1
+            self._file.close()
+            self._file=open(self._segment_path(first_seq),"w",encoding="utf-8")
+            return first_seq
+
+    def truncate_before(self,first_seq:int):
+        """Deletes segments that only hold records older than `first_seq`."""
+        with self._io_lock:
+            for start,path in self.segments():
+                if start<first_seq and path!=self._file.name:
+                    os.remove(path)
+
+    def close(self):
+        with self._lock:
+            if self._stop.is_set():
+                return
+            self._stop.set()
+        self._flusher.join()
+        with self._io_lock:
+            try:
+                self._write_buffered()
+            finally:
+                empty=self._error is None and self._file.tell()==0
+                self._file.close()
+                if empty:
+                    os.remove(self._file.name)
@@ -0,0 +1,102 @@
+import asyncio
+import unittest
+from datetime import datetime
+from bank.async_bank import AsyncBank
+from bank.bank import Bank
+from model.model import TransactionType,TransactionStatus
+
+
+class TestMakeTransactions(unittest.TestCase):
+    def setUp(self):
+        self.bank=Bank(workers=2)
+        now=datetime(2024,1,1)
+        for account_id,balance in (("boss",100),("other",10),("x",0),("y",0)):
+            self.bank.create_account(account_id,balance,now)
+
+    def tearDown(self):
+        self.bank.shutdown()
+
+    def balance(self,account_id):
+        return self.bank.storage.get_account(account_id).balance
+
+    def test_failing_item_does_not_block_its_group(self):
+        transactions=self.bank.make_transactions([
+            ("boss",60,TransactionType.TRANSFER,"x"),
+            ("other",5,TransactionType.WITHDRAW),
+            ("boss",60,TransactionType.TRANSFER,"y"),
+            ("boss",30,TransactionType.TRANSFER,"y"),
+            ("boss",5,TransactionType.DEPOSIT),
+        ])
+        self.bank.transaction_manager.drain()
+        # grouped by sender in order; the second 60 overdraws boss and the items after it still run
+        self.assertEqual([(t.account_id,t.amount) for t in transactions],[("boss",60),("boss",60),("boss",30),("boss",5),("other",5)])
+        completed,failed=TransactionStatus.COMPLETED,TransactionStatus.FAILED
+        self.assertEqual([t.status for t in transactions],[completed,failed,completed,completed,completed])
+        self.assertEqual(self.balance("boss"),15)
+        self.assertEqual(self.balance("x"),60)
+        self.assertEqual(self.balance("y"),30)
+        self.assertEqual(self.balance("other"),5)
+        # statuses were written back to storage
+        for transaction in transactions:
+            self.assertEqual(self.bank.storage.get_transaction(transaction.transaction_id).status,transaction.status)
+
+    def test_groups_keep_submission_order(self):
+        transactions=self.bank.make_transactions([
+            ("boss",100,TransactionType.TRANSFER,"x"),
+            ("boss",1,TransactionType.WITHDRAW),
+        ])
+        self.bank.transaction_manager.drain()
+        self.assertEqual([t.status for t in transactions],[TransactionStatus.COMPLETED,TransactionStatus.FAILED])
+
+
+class TestAsyncBank(unittest.TestCase):
+    def test_future_resolves_on_completion(self):
+        async def run():
+            bank=AsyncBank(Bank(workers=2))
+            await bank.create_account("a",10,datetime(2024,1,1))
+            await bank.create_account("b",0,datetime(2024,1,1))
+            future=await bank.make_transaction("a",4,TransactionType.TRANSFER,"b")
+            done=await asyncio.wait_for(future,5)
+            failed=await asyncio.wait_for(bank.transact("a",100,TransactionType.WITHDRAW),5)
+            statement=await bank.get_statement("b")
+            await bank.shutdown()
+            return done,failed,statement,bank
+
+        done,failed,statement,bank=asyncio.run(run())
+        self.assertEqual(done.status,TransactionStatus.COMPLETED)
+        self.assertEqual(failed.status,TransactionStatus.FAILED)
+        self.assertEqual([t.transaction_id for t in statement],[done.transaction_id])
+        self.assertEqual(bank.bank.storage.get_account("b").balance,4)
+        self.assertEqual(bank._pending,{})
+
+    def test_full_queue_backs_off_without_blocking_the_loop(self):
+        async def run():
+            bank=AsyncBank(Bank(workers=1,max_queue_size=1),poll_interval=0.001,max_poll_interval=0.005)
+            await bank.create_account("a",0,datetime(2024,1,1))
+            # the worker blocks on the account's lock with the first deposit, the second fills the queue
+            held=bank.bank.lock_manager.acquire_locks("a")
+            first=await bank.make_transaction("a",1,TransactionType.DEPOSIT)
+            while bank.bank.transaction_manager.metrics()["queue_depths"]!=[0]:
+                await asyncio.sleep(0.001)
+            second=await bank.make_transaction("a",2,TransactionType.DEPOSIT)
+            third=asyncio.ensure_future(bank.make_transaction("a",3,TransactionType.DEPOSIT))
+            ticks=0
+            while ticks<20:
+                # the loop keeps running while the third submission waits for room
+                await asyncio.sleep(0.002)
+                ticks+=1
+            waiting=not third.done()
+            held.release()
+            results=await asyncio.wait_for(asyncio.gather(first,second,await third),5)
+            await bank.shutdown()
+            return waiting,results,bank
+
+        waiting,results,bank=asyncio.run(run())
+        self.assertTrue(waiting)
+        self.assertEqual([t.status for t in results],[TransactionStatus.COMPLETED]*3)
+        self.assertEqual(bank.bank.storage.get_account("a").balance,6)
+        self.assertEqual(bank.bank.transaction_manager.metrics()["max_queue_depths"],[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import uuid
+from dataclasses import replace
+from datetime import datetime,timedelta
+from model.model import Account,Transaction,TransactionType
+from storage.storage import InMemoryStorage,VersionConflict
+
+
+class TestSaveAccounts(unittest.TestCase):
+    def setUp(self):
+        self.storage=InMemoryStorage()
+        self.now=datetime(2024,1,1)
+        for account_id in ("a","b"):
+            self.storage.save_account(Account(account_id,100,self.now))
+
+    def test_compare_and_swap(self):
+        a=self.storage.get_account("a")
+        saved=self.storage.save_account(replace(a,balance=90),a.version)
+        self.assertEqual(saved.version,a.version+1)
+        self.assertRaises(VersionConflict,self.storage.save_account,replace(a,balance=80),a.version)
+        self.assertEqual(self.storage.get_account("a").balance,90)
+        # returned records are replaced, never mutated
+        self.assertEqual(a.balance,100)
+
+    def test_all_or_nothing(self):
+        a,b=self.storage.get_account("a"),self.storage.get_account("b")
+        self.storage.save_account(replace(b,balance=50))
+        with self.assertRaises(VersionConflict) as caught:
+            self.storage.save_accounts([(replace(a,balance=0),a.version),(replace(b,balance=200),b.version)])
+        self.assertEqual(caught.exception.account_id,"b")
+        self.assertEqual(self.storage.get_account("a"),a)
+        self.assertEqual(self.storage.get_account("b").balance,50)
+        b=self.storage.get_account("b")
+        stored=self.storage.save_accounts([(replace(a,balance=0),a.version),(replace(b,balance=200),b.version)])
+        self.assertEqual([account.version for account in stored],[a.version+1,b.version+1])
+        self.assertEqual(self.storage.get_account("b").balance,200)
+
+
+class TestStatement(unittest.TestCase):
+    def setUp(self):
+        self.storage=InMemoryStorage()
+        self.start=datetime(2024,1,1)
+
+    def save(self,minutes,account_id="a",to=None):
+        transaction_type=TransactionType.TRANSFER if to is not None else TransactionType.DEPOSIT
+        transaction=Transaction(str(uuid.uuid4()),transaction_type,account_id,minutes,to,created_at=self.start+timedelta(minutes=minutes))
+        self.storage.save_transactions(transaction)
+        return transaction
+
+    def test_bounds_are_inclusive(self):
+        saved=[self.save(minutes) for minutes in range(5)]
+        statement=self.storage.get_statement("a",self.start+timedelta(minutes=1),self.start+timedelta(minutes=3))
+        self.assertEqual(statement,saved[1:4])
+        self.assertEqual(self.storage.get_statement("a",start=self.start+timedelta(minutes=4)),saved[4:])
+        self.assertEqual(self.storage.get_statement("a",end=self.start),saved[:1])
+        self.assertEqual(self.storage.get_statement("a",self.start+timedelta(seconds=30),self.start+timedelta(seconds=40)),[])
+        self.assertEqual(self.storage.get_statement("nobody"),[])
+
+    def test_out_of_order_rows(self):
+        saved={minutes:self.save(minutes) for minutes in (3,0,4,1,2)}
+        self.assertEqual(self.storage.get_statement("a"),[saved[minutes] for minutes in range(5)])
+        statement=self.storage.get_statement("a",self.start+timedelta(minutes=1),self.start+timedelta(minutes=2))
+        self.assertEqual(statement,[saved[1],saved[2]])
+
+    def test_transfer_on_both_statements(self):
+        deposit=self.save(0,"b")
+        payment=self.save(1,"a","b")
+        self.assertEqual(self.storage.get_statement("a"),[payment])
+        self.assertEqual(self.storage.get_statement("b"),[deposit,payment])
+        # a status update does not add the row to a ledger again
+        self.storage.update_transactions(payment)
+        self.assertEqual(len(self.storage.get_statement("b")),2)
+
+
+if __name__ == "__main__":
+    unittest.main()
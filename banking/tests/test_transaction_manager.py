@@ -0,0 +1,222 @@
+import threading
+import time
+import unittest
+import uuid
+from datetime import datetime
+from lockmanager.lockmanager import DeadlockDetected,LockManager
+from model.model import Account,Transaction,TransactionType,TransactionStatus
+from dataclasses import replace
+from storage.storage import InMemoryStorage
+from transaction.transaction_manager import ConcurrencyMode,TransactionManager
+
+
+class FlakyStorage(InMemoryStorage):
+    """Fails to record the next `failures` transaction updates."""
+
+    def __init__(self,failures):
+        super().__init__()
+        self.failures=failures
+
+    def update_all_transactions(self,transactions):
+        if self.failures:
+            self.failures-=1
+            raise OSError("disk full")
+        super().update_all_transactions(transactions)
+
+
+class RacingStorage(InMemoryStorage):
+    """Before each of the next `races` conditional saves, another writer deposits 1 into every account touched."""
+
+    def __init__(self,races):
+        super().__init__()
+        self.races=races
+
+    def save_accounts(self,updates):
+        if self.races and all(expected_version is not None for _,expected_version in updates):
+            self.races-=1
+            for account,_ in updates:
+                current=self.get_account(account.account_id)
+                super().save_accounts([(replace(current,balance=current.balance+1),None)])
+        return super().save_accounts(updates)
+
+
+class CountingStorage(InMemoryStorage):
+    def __init__(self):
+        super().__init__()
+        self.saves=[]
+
+    def save_accounts(self,updates):
+        self.saves.append([account.account_id for account,_ in updates])
+        return super().save_accounts(updates)
+
+
+class DeadlockingLockManager(LockManager):
+    def acquire_locks(self,*accounts,owner=None,started_at=None,ordered=True):
+        self.cycles_detected+=1
+        raise DeadlockDetected(owner,[owner])
+
+
+class InterleavingLockManager(LockManager):
+    """Holds each owner's first stripe until two owners hold one, forcing lock order interleaving."""
+
+    def __init__(self):
+        super().__init__()
+        self.barrier=threading.Barrier(2)
+        self.started=set()
+
+    def _acquire_stripe(self,stripe,owner,started_at):
+        super()._acquire_stripe(stripe,owner,started_at)
+        if owner not in self.started:
+            self.started.add(owner)
+            self.barrier.wait(5)
+
+
+def deposit(account_id,amount):
+    return Transaction(str(uuid.uuid4()),TransactionType.DEPOSIT,account_id,amount)
+
+
+def transfer(account_id,receiptent_account_id,amount):
+    return Transaction(str(uuid.uuid4()),TransactionType.TRANSFER,account_id,amount,receiptent_account_id)
+
+
+class TestWorkerErrors(unittest.TestCase):
+    def test_worker_survives_storage_error(self):
+        storage=FlakyStorage(failures=1)
+        storage.save_account(Account("a",0,datetime.now()))
+        manager=TransactionManager(storage,LockManager(),workers=1,max_queue_size=1)
+        first,second,third=deposit("a",1),deposit("a",2),deposit("a",3)
+        manager.submit(first)
+        manager.submit([second,third])
+        drained=threading.Thread(target=manager.drain,daemon=True)
+        drained.start()
+        drained.join(5)
+        self.assertFalse(drained.is_alive())
+        # first's deposit was applied; only writing its status failed
+        self.assertEqual(first.status,TransactionStatus.COMPLETED)
+        self.assertEqual(second.status,TransactionStatus.COMPLETED)
+        self.assertEqual(storage.get_account("a").balance,6)
+        metrics=manager.metrics()
+        self.assertEqual(metrics["completed"],3)
+        self.assertEqual(metrics["failed"],0)
+        self.assertEqual(metrics["unrecorded"],1)
+        manager.shutdown()
+
+
+class TestUnorderedLocks(unittest.TestCase):
+    def test_opposite_transfers_abort_and_retry(self):
+        lock_manager=InterleavingLockManager()
+        first="a"
+        second=next(str(i) for i in range(1000) if lock_manager.stripe_of(str(i))!=lock_manager.stripe_of(first))
+        storage=InMemoryStorage()
+        for account_id in (first,second):
+            storage.save_account(Account(account_id,100,datetime.now()))
+        manager=TransactionManager(storage,lock_manager,workers=1,ordered_locks=False)
+        transfers=[transfer(first,second,10),transfer(second,first,30)]
+        threads=[threading.Thread(target=manager.process_transaction,args=(t,)) for t in transfers]
+        start=time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        # the cycle is broken by the detector, not by a timeout
+        self.assertLess(time.monotonic()-start,0.5)
+        self.assertEqual([t.status for t in transfers],[TransactionStatus.COMPLETED]*2)
+        self.assertEqual(storage.get_account(first).balance,120)
+        self.assertEqual(storage.get_account(second).balance,80)
+        metrics=manager.metrics()
+        self.assertEqual(metrics["deadlocks"],1)
+        self.assertEqual(metrics["retries"],1)
+        manager.shutdown()
+
+
+class TestOptimistic(unittest.TestCase):
+    def manager(self,storage,max_conflict_retries=100):
+        for account_id in ("a","b"):
+            storage.save_account(Account(account_id,100,datetime.now()))
+        return TransactionManager(storage,LockManager(),workers=1,mode=ConcurrencyMode.OPTIMISTIC,max_conflict_retries=max_conflict_retries)
+
+    def test_conflict_is_retried(self):
+        storage=RacingStorage(races=2)
+        manager=self.manager(storage)
+        payment=transfer("a","b",30)
+        manager.process_transaction(payment)
+        self.assertEqual(payment.status,TransactionStatus.COMPLETED)
+        # both racing deposits and the transfer, each applied once
+        self.assertEqual(storage.get_account("a").balance,72)
+        self.assertEqual(storage.get_account("b").balance,132)
+        self.assertEqual(manager.metrics()["conflicts"],2)
+        manager.shutdown()
+
+    def test_batch_conflict_is_retried(self):
+        storage=RacingStorage(races=1)
+        manager=self.manager(storage)
+        batch=[transfer("a","b",30),deposit("a",5)]
+        manager.process_batch(batch)
+        self.assertEqual([t.status for t in batch],[TransactionStatus.COMPLETED]*2)
+        self.assertEqual(storage.get_account("a").balance,76)
+        self.assertEqual(storage.get_account("b").balance,131)
+        manager.shutdown()
+
+    def test_gives_up_after_max_conflict_retries(self):
+        storage=RacingStorage(races=100)
+        manager=self.manager(storage,max_conflict_retries=3)
+        payment=transfer("a","b",30)
+        manager.process_transaction(payment)
+        self.assertEqual(payment.status,TransactionStatus.FAILED)
+        # only the four racing deposits landed: the first try and three retries
+        self.assertEqual(storage.get_account("a").balance,104)
+        self.assertEqual(storage.get_account("b").balance,104)
+        self.assertEqual(manager.metrics()["conflicts"],3)
+        manager.shutdown()
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.now=datetime(2024,1,1)
+
+    def accounts(self,storage):
+        for account_id,balance in (("a",100),("b",0),("c",0)):
+            storage.save_account(Account(account_id,balance,self.now))
+
+    def test_one_save_per_touched_account(self):
+        storage=CountingStorage()
+        self.accounts(storage)
+        storage.saves.clear()
+        manager=TransactionManager(storage,LockManager(),workers=1)
+        batch=[transfer("a","b",10),transfer("a","c",20),transfer("a","b",500),deposit("a",1),transfer("a","c",5)]
+        manager.process_batch(batch)
+        self.assertEqual(storage.saves,[["a","b","c"]])
+        self.assertEqual([t.status for t in batch].count(TransactionStatus.FAILED),1)
+        self.assertEqual(batch[2].status,TransactionStatus.FAILED)
+        self.assertEqual([storage.get_account(account_id).balance for account_id in ("a","b","c")],[66,10,25])
+        self.assertEqual(manager.metrics()["completed"],4)
+        manager.shutdown()
+
+    def test_deadlock_fails_whole_batch(self):
+        storage=InMemoryStorage()
+        self.accounts(storage)
+        manager=TransactionManager(storage,DeadlockingLockManager(),workers=1,max_retries=2,backoff_seconds=0)
+        batch=[transfer("a","b",10),deposit("a",1)]
+        manager.process_batch(batch)
+        self.assertEqual([t.status for t in batch],[TransactionStatus.FAILED]*2)
+        self.assertEqual(storage.get_account("a").balance,100)
+        metrics=manager.metrics()
+        self.assertEqual(metrics["failed"],2)
+        self.assertEqual(metrics["retries"],2)
+        manager.shutdown()
+
+    def test_version_conflict_fails_whole_batch(self):
+        storage=RacingStorage(races=100)
+        self.accounts(storage)
+        manager=TransactionManager(storage,LockManager(),workers=1,mode=ConcurrencyMode.OPTIMISTIC,max_conflict_retries=1)
+        batch=[transfer("a","b",10),deposit("a",1)]
+        manager.process_batch(batch)
+        # _apply_batch had marked them COMPLETED before the save lost the race
+        self.assertEqual([t.status for t in batch],[TransactionStatus.FAILED]*2)
+        self.assertEqual(storage.get_account("b").balance,2)
+        self.assertEqual(manager.metrics()["failed"],2)
+        manager.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
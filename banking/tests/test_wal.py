@@ -0,0 +1,189 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import uuid
+from datetime import datetime
+from model.model import Account,Transaction,TransactionType,TransactionStatus
+from lockmanager.lockmanager import LockManager
+from storage.storage import InMemoryStorage,NotDurable
+from transaction.transaction_manager import TransactionManager
+from storage.wal import WriteAheadLog,WriteAheadLogFailed,list_segments
+
+
+class FailingFile:
+    """Stands in for the open segment; every write fails like a full disk."""
+
+    def __init__(self,file):
+        self.file=file
+        self.name=file.name
+
+    def write(self,data):
+        raise OSError(28,"No space left on device")
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class TestWriteAheadLog(unittest.TestCase):
+    def setUp(self):
+        self.dir=tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self):
+        return list(WriteAheadLog.read(list_segments(self.dir)))
+
+    def test_reopen(self):
+        wal=WriteAheadLog(self.dir)
+        seqs=[wal.append("record {}".format(i)) for i in range(3)]
+        self.assertTrue(wal.wait_for(seqs[-1],timeout=5))
+        wal.close()
+        wal=WriteAheadLog(self.dir)
+        self.assertEqual(wal.append("record 3"),4)
+        wal.close()
+        self.assertEqual(self.read(),[(1,"record 0"),(2,"record 1"),(3,"record 2"),(4,"record 3")])
+
+    def test_torn_last_line(self):
+        wal=WriteAheadLog(self.dir)
+        wal.append("whole")
+        wal.close()
+        _,path=list_segments(self.dir)[-1]
+        with open(path,"a") as f:
+            f.write("2 half writ")
+        wal=WriteAheadLog(self.dir)
+        self.assertEqual(wal.append("after"),2)
+        wal.close()
+        self.assertEqual(self.read(),[(1,"whole"),(2,"after")])
+
+    def test_write_failure_wakes_waiters(self):
+        wal=WriteAheadLog(self.dir,flush_interval=0.01)
+        wal._file=FailingFile(wal._file)
+        seq=wal.append("lost")
+        errors=[]
+
+        def waiter():
+            try:
+                wal.wait_for(seq)
+            except WriteAheadLogFailed as e:
+                errors.append(e)
+
+        threads=[threading.Thread(target=waiter) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+        self.assertEqual(len(errors),3)
+        self.assertIsInstance(errors[0].__cause__,OSError)
+        self.assertRaises(WriteAheadLogFailed,wal.append,"more")
+        self.assertRaises(WriteAheadLogFailed,wal.close)
+
+
+class TestStorageRecovery(unittest.TestCase):
+    def setUp(self):
+        self.dir=tempfile.mkdtemp()
+        self.now=datetime(2024,1,1)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self,storage,account_id,balance):
+        storage.save_account(Account(account_id,balance,self.now))
+        transaction=Transaction(str(uuid.uuid4()),TransactionType.DEPOSIT,account_id,balance,status=TransactionStatus.COMPLETED,created_at=self.now)
+        storage.save_transactions(transaction)
+        return transaction
+
+    def test_reopen(self):
+        storage=InMemoryStorage(self.dir)
+        first=self.write(storage,"a",10)
+        self.write(storage,"a",20)
+        storage.close()
+        storage=InMemoryStorage(self.dir)
+        self.assertEqual(storage.get_account("a").balance,20)
+        self.assertEqual(storage.get_account("a").version,1)
+        self.assertEqual(storage.get_transaction(first.transaction_id).status,TransactionStatus.COMPLETED)
+        self.assertEqual(len(storage.get_statement("a")),2)
+        storage.close()
+
+    def test_snapshot_then_reopen(self):
+        storage=InMemoryStorage(self.dir)
+        first=self.write(storage,"a",10)
+        self.write(storage,"b",5)
+        storage.snapshot()
+        self.write(storage,"b",7)
+        storage.close()
+        names=os.listdir(self.dir)
+        self.assertEqual(len([name for name in names if name.startswith("snapshot-")]),1)
+        self.assertFalse(any(name.endswith(".tmp") for name in names))
+        storage=InMemoryStorage(self.dir)
+        self.assertEqual(storage.get_account("a").balance,10)
+        self.assertEqual(storage.get_account("b").balance,7)
+        self.assertEqual(len(storage.get_statement("b")),2)
+        self.assertEqual(storage.get_transaction(first.transaction_id),first)
+        self.write(storage,"a",12)
+        self.assertEqual(len(storage.get_statement("a")),2)
+        storage.close()
+
+    def test_torn_log_tail(self):
+        storage=InMemoryStorage(self.dir)
+        self.write(storage,"a",10)
+        storage.close()
+        _,path=list_segments(self.dir)[-1]
+        with open(path,"a") as f:
+            f.write('9 ["a",["a",99')
+        storage=InMemoryStorage(self.dir)
+        self.assertEqual(storage.get_account("a").balance,10)
+        self.write(storage,"a",11)
+        storage.close()
+        storage=InMemoryStorage(self.dir)
+        self.assertEqual(storage.get_account("a").balance,11)
+        storage.close()
+
+    def test_save_all_transactions(self):
+        storage=InMemoryStorage(self.dir)
+        transactions=[Transaction(str(uuid.uuid4()),TransactionType.DEPOSIT,"a",i,created_at=self.now) for i in range(50)]
+        storage.save_all_transactions(transactions)
+        storage.close()
+        # one log record, so one fsync for the whole batch
+        self.assertEqual(len(list(WriteAheadLog.read(list_segments(self.dir)))),1)
+        storage=InMemoryStorage(self.dir)
+        self.assertEqual(len(storage.get_statement("a")),50)
+        self.assertEqual(storage.get_transaction(transactions[-1].transaction_id),transactions[-1])
+        storage.close()
+
+    def test_log_failure(self):
+        storage=InMemoryStorage(self.dir,flush_interval=0.01)
+        storage.save_account(Account("a",0,self.now))
+        storage._wal._file=FailingFile(storage._wal._file)
+        manager=TransactionManager(storage,LockManager(),workers=1)
+        deposit=Transaction(str(uuid.uuid4()),TransactionType.DEPOSIT,"a",10)
+        manager.process_transaction(deposit)
+        # the deposit was published before the fsync failed, so it stays applied
+        self.assertEqual(deposit.status,TransactionStatus.COMPLETED)
+        self.assertEqual(storage.get_account("a").balance,10)
+        self.assertEqual(manager.metrics()["unrecorded"],1)
+        # a failed log rejects later writes before they are applied
+        self.assertRaises(WriteAheadLogFailed,storage.save_account,Account("b",5,self.now))
+        self.assertRaises(KeyError,storage.get_account,"b")
+        withdraw=Transaction(str(uuid.uuid4()),TransactionType.WITHDRAW,"a",4)
+        manager.process_transaction(withdraw)
+        self.assertEqual(withdraw.status,TransactionStatus.FAILED)
+        self.assertEqual(storage.get_account("a").balance,10)
+        manager.shutdown()
+        self.assertRaises(WriteAheadLogFailed,storage.close)
+
+    def test_not_durable(self):
+        storage=InMemoryStorage(self.dir,flush_interval=0.01)
+        storage._wal._file=FailingFile(storage._wal._file)
+        self.assertRaises(NotDurable,storage.save_account,Account("a",1,self.now))
+        self.assertEqual(storage.get_account("a").balance,1)
+        self.assertRaises(WriteAheadLogFailed,storage.close)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,54 +1,341 @@
-from lockmanager.lockmanager import LockManager 
-from storage.storage import InMemoryStorage
+from lockmanager.lockmanager import LockManager,DeadlockDetected
+from storage.storage import InMemoryStorage,NotDurable,VersionConflict
 from model.model import Transaction,Account,TransactionType,TransactionStatus
 from queue import Queue
-import threading 
+from dataclasses import replace
+from contextlib import nullcontext
+from enum import Enum
+from typing import Callable,Dict,List,Optional,Union
+import random
+import threading
+import time
 
 
+_STOP=object()
 
-class TransactionManager: 
 
-    def __init__(self,storage:InMemoryStorage,lock_manager:LockManager):
-        self.storage=storage 
+class ConcurrencyMode(Enum):
+    PESSIMISTIC="pessimistic"
+    OPTIMISTIC="optimistic"
+
+
+class TransactionManager:
+    """
+    Runs transactions on a pool of worker threads.
+
+    Every worker owns one bounded queue. A transaction is routed to a queue by
+    hashing its account_id, so all operations started by one account are applied
+    in submission order while unrelated accounts run in parallel. A full queue
+    blocks submit(), which keeps memory bounded when producers outrun workers.
+
+    Accounts are locked in stripe order by default, which cannot deadlock. With
+    `ordered_locks=False` a transfer locks its sender before its recipient, so
+    two opposite transfers can deadlock; the lock manager's detector then aborts
+    one of them, which is retried up to `max_retries` times with jittered
+    exponential backoff starting at `backoff_seconds`, keeping its original
+    start time so it ages into priority.
+
+    In OPTIMISTIC mode no account locks are taken: a transaction reads the
+    accounts' current versions, computes the new balances and commits them with
+    one compare-and-swap over all touched accounts, starting over (up to
+    `max_conflict_retries` times) when another writer got there first.
+    """
+
+    def __init__(self,storage:InMemoryStorage,lock_manager:LockManager,workers:int=4,max_queue_size:int=10000,max_retries:int=5,backoff_seconds:float=0.001,mode:ConcurrencyMode=ConcurrencyMode.PESSIMISTIC,max_conflict_retries:int=100,ordered_locks:bool=True):
+        if workers<1:
+            raise ValueError("workers must be >= 1, got:{}".format(workers))
+        self.storage=storage
         self.lock_manager=lock_manager
-        self.transaction_queue:Queue[Transaction]=Queue()
+        self.workers=workers
+        self.transaction_queues:List[Queue]=[Queue(maxsize=max_queue_size) for _ in range(workers)]
+        self._metricsLock=threading.Lock()
+        self._submitted=0
+        self._completed=0
+        self._failed=0
+        self._retries=0
+        self._conflicts=0
+        self._unrecorded=0
+        self.mode=mode
+        self.ordered_locks=ordered_locks
+        self.max_retries=max_retries
+        self.max_conflict_retries=max_conflict_retries
+        self.backoff_seconds=backoff_seconds
+        self._max_depth=[0]*workers
+        self._threads:List[threading.Thread]=[]
+        self._listeners:List[Callable[[Transaction],None]]=[]
+        self._closed=False
         self._process_transactions()
 
     def _process_transactions(self):
-        def process_transaction(self): 
-            while True: 
-                print("yeahjhjkhh")
-                transaction=self.transaction_queue.get()
-                if transaction.transaction__type == TransactionType.TRANSFER:
-                    self.process_transfer_transaction(transaction)
-                else: 
-                    self.process_single_account_transaction(transaction)
-        
-        thread=threading.Thread(target=process_transaction,args=(self),daemon=True)
-        thread.start()
+        for index in range(self.workers):
+            thread=threading.Thread(
+                target=self._worker,
+                args=(self.transaction_queues[index],),
+                name="transaction-worker-{}".format(index),
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self,transaction_queue:Queue):
+        while True:
+            transaction=transaction_queue.get()
+            try:
+                if transaction is _STOP:
+                    return
+                if isinstance(transaction,list):
+                    self.process_batch(transaction)
+                else:
+                    self.process_transaction(transaction)
+            except Exception as e:
+                # last resort so the partition keeps draining
+                self._fail(transaction if isinstance(transaction,list) else [transaction],e)
+            finally:
+                transaction_queue.task_done()
+
+    def _fail(self,transactions:List[Transaction],error:Exception):
+        # only transactions that never got an outcome are failed; an applied one stays COMPLETED
+        print("transactions starting with:{} failed. Exception:{}".format(transactions[0].transaction_id,error))
+        for transaction in transactions:
+            if transaction.status == TransactionStatus.PENDING:
+                transaction.status=TransactionStatus.FAILED
+        self._record_statuses(transactions)
+        self._count(transactions)
+        for transaction in transactions:
+            self._notify(transaction)
+
+    def _record_statuses(self,transactions:List[Transaction]):
+        """
+        Stores final statuses in one write. The outcome is already decided at this
+        point, so a failed write is reported and counted as unrecorded, never
+        turned into FAILED.
+        """
+        try:
+            self.storage.update_all_transactions(transactions)
+        except Exception as e:
+            print("could not record status of transactions starting with:{}. Exception:{}".format(transactions[0].transaction_id,e))
+            with self._metricsLock:
+                self._unrecorded+=len(transactions)
+
+    def _count(self,transactions:List[Transaction]):
+        completed=sum(1 for transaction in transactions if transaction.status == TransactionStatus.COMPLETED)
+        with self._metricsLock:
+            self._completed+=completed
+            self._failed+=len(transactions)-completed
+
+    def add_listener(self,listener:Callable[[Transaction],None]):
+        """Registers a callback run on the worker thread once a transaction is COMPLETED or FAILED."""
+        self._listeners.append(listener)
+
+    def _notify(self,transaction:Transaction):
+        for listener in self._listeners:
+            try:
+                listener(transaction)
+            except Exception as e:
+                print("listener failed for transaction:{}. Exception:{}".format(transaction.transaction_id,e))
+
+    def _partition(self,account_id:str)->int:
+        return hash(account_id)%self.workers
+
+    def submit(self,transaction:Union[Transaction,List[Transaction]],block:bool=True,timeout:Optional[float]=None):
+        """
+        Queues a transaction, or a batch (list) that is applied as one unit on the
+        partition of its first transaction. Raises queue.Full if block is False
+        (or timeout expires) and the partition is full.
+        """
+        if self._closed:
+            raise RuntimeError("TransactionManager is shut down")
+        batch=transaction if isinstance(transaction,list) else [transaction]
+        if not batch:
+            return
+        index=self._partition(batch[0].account_id)
+        transaction_queue=self.transaction_queues[index]
+        transaction_queue.put(transaction,block,timeout)
+        depth=transaction_queue.qsize()
+        with self._metricsLock:
+            self._submitted+=len(batch)
+            if depth>self._max_depth[index]:
+                self._max_depth[index]=depth
+
+    def _with_retries(self,work:Callable[[float],object]):
+        started_at=time.monotonic()
+        attempt=0
+        conflicts=0
+        while True:
+            try:
+                return work(started_at)
+            except DeadlockDetected:
+                attempt+=1
+                if attempt>self.max_retries:
+                    raise
+                with self._metricsLock:
+                    self._retries+=1
+                time.sleep(random.uniform(0,self.backoff_seconds*(2**attempt)))
+            except VersionConflict:
+                conflicts+=1
+                if conflicts>self.max_conflict_retries:
+                    raise
+                with self._metricsLock:
+                    self._conflicts+=1
+                if conflicts>1:
+                    # the first retry is immediate; keep backing off if the account stays hot
+                    time.sleep(random.uniform(0,self.backoff_seconds*(2**min(conflicts,10))))
+
+    def _locks(self,account_ids:List[str],owner:str,started_at:Optional[float]):
+        if self.mode == ConcurrencyMode.OPTIMISTIC:
+            return nullcontext()
+        return self.lock_manager.acquire_locks(*account_ids,owner=owner,started_at=started_at,ordered=self.ordered_locks)
+
+    def _apply(self,transaction:Transaction,started_at:float):
+        if transaction.transactionType == TransactionType.TRANSFER:
+            self.process_transfer_transaction(transaction,started_at)
+        else:
+            self.process_single_account_transaction(transaction,started_at)
+
+    def process_transaction(self,transaction:Transaction):
+        try:
+            self._with_retries(lambda started_at:self._apply(transaction,started_at))
+            transaction.status=TransactionStatus.COMPLETED
+        except NotDurable as e:
+            # the balances were published; failing it now would contradict what readers saw
+            print("transaction:{} applied but not durable. Exception:{}".format(transaction.transaction_id,e))
+            transaction.status=TransactionStatus.COMPLETED
+        except Exception as e:
+            print("transaction:{} failed. Exception:{}".format(transaction.transaction_id,e))
+            transaction.status=TransactionStatus.FAILED
+        self._record_statuses([transaction])
+        self._count([transaction])
+        self._notify(transaction)
+
+    def process_batch(self,transactions:List[Transaction]):
+        """
+        Applies a batch under a single lock acquisition.
+
+        Every account touched by the batch is locked once (in stripe order unless
+        ordered_locks is False) and read once. Transactions are applied in batch
+        order against working balances, so one failing transaction does not stop
+        the rest. Each touched account is then written back to storage exactly
+        once, in one atomic save.
+        In optimistic mode no locks are taken and the whole batch is recomputed
+        if that save hits a version conflict.
+        """
+        account_ids=[]
+        for transaction in transactions:
+            account_ids.append(transaction.account_id)
+            if transaction.transactionType == TransactionType.TRANSFER:
+                account_ids.append(transaction.receiptent_account_id)
+        account_ids=list(dict.fromkeys(account_ids))
+        try:
+            self._with_retries(lambda started_at:self._apply_batch(transactions,account_ids,started_at))
+        except NotDurable as e:
+            # saved and visible; the statuses set by _apply_batch stand
+            print("batch starting with transaction:{} applied but not durable. Exception:{}".format(transactions[0].transaction_id,e))
+        except Exception as e:
+            # the batch's single save did not happen, so nothing in it was applied
+            print("batch starting with transaction:{} failed. Exception:{}".format(transactions[0].transaction_id,e))
+            for transaction in transactions:
+                transaction.status=TransactionStatus.FAILED
+
+        self._record_statuses(transactions)
+        self._count(transactions)
+        for transaction in transactions:
+            self._notify(transaction)
+
+    def _apply_batch(self,transactions:List[Transaction],account_ids:List[str],started_at:float):
+        with self._locks(account_ids,transactions[0].transaction_id,started_at):
+            accounts={}
+            for account_id in account_ids:
+                try:
+                    accounts[account_id]=self.storage.get_account(account_id)
+                except KeyError:
+                    pass
+            balances={account_id:account.balance for account_id,account in accounts.items()}
+
+            for transaction in transactions:
+                try:
+                    self._apply_to_balances(transaction,balances)
+                    transaction.status=TransactionStatus.COMPLETED
+                except Exception as e:
+                    print("transaction:{} failed. Exception:{}".format(transaction.transaction_id,e))
+                    transaction.status=TransactionStatus.FAILED
+
+            updates=[
+                (replace(account,balance=balances[account_id]),account.version)
+                for account_id,account in accounts.items()
+                if balances[account_id]!=account.balance
+            ]
+            if updates:
+                self.storage.save_accounts(updates)
+
+    def _apply_to_balances(self,transaction:Transaction,balances:Dict[str,int]):
+        if transaction.account_id not in balances:
+            raise KeyError(transaction.account_id)
+        if transaction.transactionType == TransactionType.DEPOSIT:
+            balances[transaction.account_id]+=transaction.amount
+            return
+        if transaction.transactionType == TransactionType.TRANSFER and transaction.receiptent_account_id not in balances:
+            raise KeyError(transaction.receiptent_account_id)
+        if balances[transaction.account_id]<transaction.amount:
+            raise ValueError("insufficient balance in account:{}".format(transaction.account_id))
+        balances[transaction.account_id]-=transaction.amount
+        if transaction.transactionType == TransactionType.TRANSFER:
+            balances[transaction.receiptent_account_id]+=transaction.amount
+
+    def drain(self):
+        """Blocks until every queued transaction has been processed."""
+        for transaction_queue in self.transaction_queues:
+            transaction_queue.join()
+
+    def shutdown(self,wait:bool=True):
+        """Stops accepting work; workers exit after finishing what is already queued."""
+        if self._closed:
+            return
+        self._closed=True
+        for transaction_queue in self.transaction_queues:
+            transaction_queue.put(_STOP)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def metrics(self)->Dict[str,object]:
+        with self._metricsLock:
+            return {
+                "submitted":self._submitted,
+                "completed":self._completed,
+                "failed":self._failed,
+                "retries":self._retries,
+                "conflicts":self._conflicts,
+                "unrecorded":self._unrecorded,
+                "deadlocks":self.lock_manager.cycles_detected,
+                "queue_depths":[q.qsize() for q in self.transaction_queues],
+                "max_queue_depths":list(self._max_depth),
+            }
 
     def save_transaction(self,transaction:Transaction):
-        self.storage.save_transaction(transaction)
-    
-    def process_transfer_transaction(self,transaction:Transaction):
-        sender_account=self.storage.get_account(transaction.account_id)
-        recepient_account=self.storage.get_account(transaction.recepient_account_id)
-
-        self.lock_manager.acquire_locks(sender_account,recepient_account)
-
-        sender_account.balance-=transaction.amount 
-        recepient_account.balance+=transaction.amount 
-
-        self.storage.save_account(sender_account)
-        self.storage.save_account(recepient_account)
-        self.lock_manager.release_locks()
-
-
-    def process_single_account_transaction(self,transaction:Transaction):
-        self.lock_manager.acquire_locks(transaction.account_id)
-        account=self.storage.get_account(transaction.account_id)
-        account+=transaction.amount 
-    
-    
-    
-    
+        self.storage.save_transactions(transaction)
+
+    def process_transfer_transaction(self,transaction:Transaction,started_at:Optional[float]=None):
+        if transaction.account_id == transaction.receiptent_account_id:
+            raise ValueError("cannot transfer to the same account:{}".format(transaction.account_id))
+        with self._locks([transaction.account_id,transaction.receiptent_account_id],transaction.transaction_id,started_at):
+            sender_account=self.storage.get_account(transaction.account_id)
+            recepient_account=self.storage.get_account(transaction.receiptent_account_id)
+            if sender_account.balance<transaction.amount:
+                raise ValueError("insufficient balance in account:{}".format(sender_account.account_id))
+
+            self.storage.save_accounts([
+                (replace(sender_account,balance=sender_account.balance-transaction.amount),sender_account.version),
+                (replace(recepient_account,balance=recepient_account.balance+transaction.amount),recepient_account.version),
+            ])
+
+
+    def process_single_account_transaction(self,transaction:Transaction,started_at:Optional[float]=None):
+        with self._locks([transaction.account_id],transaction.transaction_id,started_at):
+            account=self.storage.get_account(transaction.account_id)
+            if transaction.transactionType == TransactionType.WITHDRAW:
+                if account.balance<transaction.amount:
+                    raise ValueError("insufficient balance in account:{}".format(account.account_id))
+                balance=account.balance-transaction.amount
+            else:
+                balance=account.balance+transaction.amount
+            self.storage.save_account(replace(account,balance=balance),account.version)
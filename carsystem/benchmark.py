@@ -0,0 +1,60 @@
+from models import Car
+from services import Storage,CarMgmt
+import threading
+import time
+
+
+"""
+run from the carsystem folder:
+    python3.8 benchmark.py
+"""
+
+
+class SlowStorage(Storage):
+    """Storage whose save_car pays a fixed delay, standing in for a database round trip."""
+
+    def __init__(self,delay):
+        super().__init__()
+        self.delay=delay
+
+    def save_car(self,car):
+        time.sleep(self.delay)
+        super().save_car(car)
+
+
+def purchase_throughput(listings,buyers=32,purchases=50,units=1000,delay=0.0005):
+    storage=SlowStorage(delay)
+    carmgmt=CarMgmt(storage)
+    for i in range(listings):
+        carmgmt.register_car(Car("car_{}".format(i),str(i),"100",str(i),units))
+    for b in range(buyers):
+        carmgmt.register_buyer("buyer_{}".format(b))
+
+    def buyer(b):
+        for p in range(purchases):
+            i=(b*purchases+p)%listings
+            carmgmt.buy_car("car_{}".format(i),str(i),"buyer_{}".format(b))
+
+    threads=[threading.Thread(target=buyer,args=(b,)) for b in range(buyers)]
+    start=time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed=time.perf_counter()-start
+
+    sold=sum(units-storage.get_car("car_{}".format(i),str(i)).available_units for i in range(listings))
+    bought=sum(len(storage.get_buyer("buyer_{}".format(b)).getcarlist()) for b in range(buyers))
+    assert sold==bought and sold<=units*listings,"oversold: sold:{} bought:{}".format(sold,bought)
+    return buyers*purchases/elapsed
+
+
+def main():
+    print("purchases/sec with 32 buyer threads")
+    print("{:>9} {:>14}".format("listings","purchases/sec"))
+    for listings in (1,4,16,64):
+        print("{:>9} {:>14.0f}".format(listings,purchase_throughput(listings)))
+
+
+if __name__ == "__main__":
+    main()
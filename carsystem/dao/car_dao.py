@@ -0,0 +1,77 @@
+from itertools import islice
+
+
+_CREATE="""
+CREATE TABLE IF NOT EXISTS cars (
+    name TEXT NOT NULL,
+    vendor_id TEXT NOT NULL,
+    car_id TEXT NOT NULL,
+    price TEXT NOT NULL,
+    price_value REAL NOT NULL,
+    available_units INTEGER NOT NULL,
+    PRIMARY KEY (name, vendor_id)
+)
+"""
+_CREATE_PRICE_INDEX="CREATE INDEX IF NOT EXISTS cars_price ON cars (price_value)"
+_CREATE_VENDOR_INDEX="CREATE INDEX IF NOT EXISTS cars_vendor ON cars (vendor_id)"
+_UPSERT="""
+INSERT INTO cars (name, vendor_id, car_id, price, price_value, available_units)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (name, vendor_id) DO UPDATE SET
+    car_id=excluded.car_id,
+    price=excluded.price,
+    price_value=excluded.price_value,
+    available_units=excluded.available_units
+"""
+_COLUMNS="name, car_id, price, vendor_id, available_units"
+_GET="SELECT "+_COLUMNS+" FROM cars WHERE name=? AND vendor_id=?"
+_BY_NAME="SELECT "+_COLUMNS+" FROM cars WHERE name=?"
+_BY_VENDOR="SELECT "+_COLUMNS+" FROM cars WHERE vendor_id=?"
+_PRICE_RANGE="SELECT "+_COLUMNS+" FROM cars WHERE price_value BETWEEN ? AND ? ORDER BY price_value"
+
+
+def _params(car):
+    return (car.name,car.vendor_id,car.car_id,str(car.price),float(car.price),car.available_units)
+
+
+class CarDao:
+    """SQL for the cars table. Rows come back as (name, car_id, price, vendor_id, available_units)."""
+
+    def __init__(self,pool,batch_size=1000):
+        self.pool=pool
+        self.batch_size=batch_size
+        with self.pool.connection() as conn:
+            conn.execute(_CREATE)
+            conn.execute(_CREATE_PRICE_INDEX)
+            conn.execute(_CREATE_VENDOR_INDEX)
+
+    def upsert(self,car):
+        with self.pool.connection() as conn:
+            conn.execute(_UPSERT,_params(car))
+
+    def upsert_many(self,cars):
+        """Writes cars in batches of batch_size rows, one transaction per batch."""
+        cars=iter(cars)
+        while True:
+            batch=[_params(car) for car in islice(cars,self.batch_size)]
+            if not batch:
+                return
+            with self.pool.connection() as conn:
+                conn.executemany(_UPSERT,batch)
+
+    def get(self,carname,vendor_id):
+        with self.pool.connection() as conn:
+            return conn.execute(_GET,(carname,vendor_id)).fetchone()
+
+    def by_name(self,carname):
+        # served by the (name, vendor_id) primary key
+        with self.pool.connection() as conn:
+            return conn.execute(_BY_NAME,(carname,)).fetchall()
+
+    def by_vendor(self,vendor_id):
+        with self.pool.connection() as conn:
+            return conn.execute(_BY_VENDOR,(vendor_id,)).fetchall()
+
+    def price_range(self,min_price,max_price):
+        with self.pool.connection() as conn:
+            return conn.execute(_PRICE_RANGE,(float(min_price),float(max_price))).fetchall()
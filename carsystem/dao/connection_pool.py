@@ -0,0 +1,42 @@
+import sqlite3
+from contextlib import contextmanager
+from queue import Queue
+
+
+class ConnectionPool:
+    """
+    A fixed set of SQLite connections shared between threads.
+
+    Every connection runs in WAL mode, so readers don't block the writer, and
+    keeps its own statement cache, so the constant SQL used by the DAOs is
+    only prepared once per connection.
+    """
+
+    def __init__(self,path,size=4,timeout=30.0):
+        if path==":memory:":
+            raise ValueError("ConnectionPool needs a file path; every :memory: connection is a separate database")
+        self.path=path
+        self.pool=Queue()
+        for _ in range(size):
+            self.pool.put(self._connect(timeout))
+
+    def _connect(self,timeout):
+        conn=sqlite3.connect(self.path,timeout=timeout,check_same_thread=False,cached_statements=256)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrows a connection; the block runs in one transaction, committed on success."""
+        conn=self.pool.get()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self.pool.put(conn)
+
+    def close(self):
+        while not self.pool.empty():
+            self.pool.get().close()
@@ -0,0 +1,60 @@
+
+_CREATE_VENDORS="CREATE TABLE IF NOT EXISTS vendors (id TEXT PRIMARY KEY, name TEXT NOT NULL)"
+_CREATE_BUYERS="CREATE TABLE IF NOT EXISTS buyers (name TEXT PRIMARY KEY)"
+_CREATE_PURCHASES="""
+CREATE TABLE IF NOT EXISTS purchases (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    buyer_name TEXT NOT NULL REFERENCES buyers (name),
+    carname TEXT NOT NULL
+)
+"""
+_CREATE_PURCHASES_INDEX="CREATE INDEX IF NOT EXISTS purchases_buyer ON purchases (buyer_name)"
+_INSERT_VENDOR="INSERT OR IGNORE INTO vendors (id, name) VALUES (?, ?)"
+_INSERT_BUYER="INSERT OR IGNORE INTO buyers (name) VALUES (?)"
+_INSERT_PURCHASE="INSERT INTO purchases (buyer_name, carname) VALUES (?, ?)"
+_GET_VENDOR="SELECT name, id FROM vendors WHERE id=?"
+_GET_BUYER="SELECT name FROM buyers WHERE name=?"
+_GET_PURCHASES="SELECT carname FROM purchases WHERE buyer_name=? ORDER BY id"
+
+
+class UserDao:
+    """SQL for vendors, buyers and the cars each buyer has bought."""
+
+    def __init__(self,pool):
+        self.pool=pool
+        with self.pool.connection() as conn:
+            conn.execute(_CREATE_VENDORS)
+            conn.execute(_CREATE_BUYERS)
+            conn.execute(_CREATE_PURCHASES)
+            conn.execute(_CREATE_PURCHASES_INDEX)
+
+    def insert_vendors(self,vendors):
+        """vendors: (name, id) pairs. Returns how many were new."""
+        with self.pool.connection() as conn:
+            before=conn.total_changes
+            conn.executemany(_INSERT_VENDOR,((id,name) for name,id in vendors))
+            return conn.total_changes-before
+
+    def insert_buyers(self,names):
+        """Returns how many were new."""
+        with self.pool.connection() as conn:
+            before=conn.total_changes
+            conn.executemany(_INSERT_BUYER,((name,) for name in names))
+            return conn.total_changes-before
+
+    def insert_purchase(self,buyer_name,carname):
+        with self.pool.connection() as conn:
+            conn.execute(_INSERT_PURCHASE,(buyer_name,carname))
+
+    def get_vendor(self,id):
+        with self.pool.connection() as conn:
+            return conn.execute(_GET_VENDOR,(id,)).fetchone()
+
+    def get_buyer(self,name):
+        """Returns (name, [carname, ...]) or None."""
+        with self.pool.connection() as conn:
+            row=conn.execute(_GET_BUYER,(name,)).fetchone()
+            if row is None:
+                return None
+            purchases=[carname for (carname,) in conn.execute(_GET_PURCHASES,(name,))]
+            return row[0],purchases
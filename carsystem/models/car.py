@@ -7,6 +7,8 @@ class Car:
         self.price=price 
         self.vendor_id=vendor_id 
         self.available_units=available_units 
+        # units held by open reservations; in memory only, never persisted
+        self.reserved_units=0
     
     def sell(self):
         self.available_units-=1
@@ -0,0 +1,158 @@
+import json
+import threading
+import time
+from models import Car
+
+try:
+    import orjson
+
+    def dumps(obj):
+        return orjson.dumps(obj)
+except ImportError:
+    def dumps(obj):
+        return json.dumps(obj,separators=(",",":")).encode()
+
+
+"""
+HTTP routes for the car system, independent of the web server.
+
+Every handler takes the parsed query or JSON body and returns
+(status, body bytes). scripts/run.py mounts them on an async server.
+
+    GET  /cars?name=&vendor_id=&min_price=&max_price=   catalog search (cached)
+    POST /cars                {name, car_id, price, vendor_id, available_units}
+    POST /cars/purchase       {name, vendor_id, buyer}
+    POST /vendors             {name, id}
+    POST /buyers              {name}
+"""
+
+
+def car_json(car):
+    return {
+        "name":car.name,
+        "car_id":car.car_id,
+        "price":car.price,
+        "vendor_id":car.vendor_id,
+        "available_units":car.available_units-car.reserved_units,
+    }
+
+
+class SearchCache:
+    """
+    Encoded search responses keyed by the normalised query.
+
+    An entry lives for `ttl` seconds, so unit counts in search results may lag
+    purchases by up to that long; purchases themselves always go through
+    CarMgmt. Registering a car clears the cache so new listings show up at once.
+    """
+
+    def __init__(self,ttl=1.0,max_entries=10000,clock=time.monotonic):
+        self.ttl=ttl
+        self.max_entries=max_entries
+        self.clock=clock
+        self.lock=threading.Lock()
+        self.entries={}
+
+    def get(self,key):
+        entry=self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at,body=entry
+        if expires_at<self.clock():
+            return None
+        return body
+
+    def put(self,key,body):
+        with self.lock:
+            if len(self.entries)>=self.max_entries:
+                self.entries.clear()
+            self.entries[key]=(self.clock()+self.ttl,body)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class CarRoutes:
+    def __init__(self,carmgmt,cache_ttl=1.0):
+        self.carmgmt=carmgmt
+        self.storage=carmgmt.storage
+        self.cache=SearchCache(cache_ttl)
+
+    @staticmethod
+    def search_key(query):
+        return (query.get("name"),query.get("vendor_id"),query.get("min_price"),query.get("max_price"))
+
+    def cached_search(self,query):
+        """The cached response body for `query`, or None. Safe to call on the event loop."""
+        return self.cache.get(self.search_key(query))
+
+    def search(self,query):
+        key=self.search_key(query)
+        body=self.cache.get(key)
+        if body is not None:
+            return 200,body
+        name,vendor_id,min_price,max_price=key
+        try:
+            low=float(min_price) if min_price is not None else float("-inf")
+            high=float(max_price) if max_price is not None else float("inf")
+        except ValueError:
+            return 400,dumps({"error":"min_price and max_price must be numbers"})
+        if name is not None and vendor_id is not None:
+            try:
+                cars=[self.storage.get_car(name,vendor_id)]
+            except ValueError as e:
+                return 404,dumps({"error":str(e)})
+        elif vendor_id is not None:
+            cars=self.storage.get_cars_by_vendor(vendor_id)
+        elif name is not None:
+            cars=self.storage.get_cars_by_name(name)
+        else:
+            cars=self.storage.get_cars_in_price_range(low,high)
+        cars=[car for car in cars if low<=float(car.price)<=high]
+        body=dumps({"cars":[car_json(car) for car in cars]})
+        self.cache.put(key,body)
+        return 200,body
+
+    def register_car(self,body):
+        try:
+            car=Car(body["name"],str(body["car_id"]),str(body["price"]),str(body["vendor_id"]),int(body["available_units"]))
+            float(car.price)
+        except (KeyError,TypeError,ValueError) as e:
+            return 400,dumps({"error":"invalid car: {}".format(e)})
+        self.carmgmt.register_car(car)
+        self.cache.clear()
+        return 201,dumps(car_json(car))
+
+    def purchase(self,body):
+        try:
+            name,vendor_id,buyer=body["name"],str(body["vendor_id"]),body["buyer"]
+        except (KeyError,TypeError) as e:
+            return 400,dumps({"error":"invalid purchase: {}".format(e)})
+        if self.carmgmt.buy_car(name,vendor_id,buyer):
+            return 200,dumps({"message":"successful"})
+        return 409,dumps({"error":"car not available"})
+
+    def register_vendor(self,body):
+        try:
+            self.carmgmt.register_vendor(body["name"],str(body["id"]))
+        except (KeyError,TypeError) as e:
+            return 400,dumps({"error":"invalid vendor: {}".format(e)})
+        return 201,dumps({"message":"successful"})
+
+    def register_buyer(self,body):
+        try:
+            self.carmgmt.register_buyer(body["name"])
+        except (KeyError,TypeError) as e:
+            return 400,dumps({"error":"invalid buyer: {}".format(e)})
+        return 201,dumps({"message":"successful"})
+
+    def routes(self):
+        """(method, path, handler) for every route; handlers take the query or body dict."""
+        return [
+            ("GET","/cars",self.search),
+            ("POST","/cars",self.register_car),
+            ("POST","/cars/purchase",self.purchase),
+            ("POST","/vendors",self.register_vendor),
+            ("POST","/buyers",self.register_buyer),
+        ]
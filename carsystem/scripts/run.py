@@ -0,0 +1,77 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import json
+from aiohttp import web
+from services import Storage,SQLiteStorage,CarMgmt
+from routes.user_routes import CarRoutes,dumps
+
+
+"""
+Serves routes.user_routes over HTTP with aiohttp.
+
+    python3.8 scripts/run.py --port 8080 [--db cars.db]
+
+Cached catalog searches are answered on the event loop. Everything else,
+including cache misses, runs on the default executor, so CarMgmt locks and
+storage I/O never block the loop.
+"""
+
+
+def _respond(status,body):
+    return web.Response(status=status,body=body,content_type="application/json")
+
+
+def build_app(routes:CarRoutes):
+    app=web.Application()
+
+    def read_handler(handler):
+        async def handle(request):
+            query=dict(request.query)
+            if handler==routes.search:
+                body=routes.cached_search(query)
+                if body is not None:
+                    return _respond(200,body)
+            loop=asyncio.get_running_loop()
+            status,body=await loop.run_in_executor(None,handler,query)
+            return _respond(status,body)
+        return handle
+
+    def write_handler(handler):
+        async def handle(request):
+            try:
+                payload=await request.json()
+            except ValueError:
+                # invalid JSON or a body that is not UTF-8
+                return _respond(400,dumps({"error":"body must be JSON"}))
+            loop=asyncio.get_running_loop()
+            status,body=await loop.run_in_executor(None,handler,payload)
+            return _respond(status,body)
+        return handle
+
+    for method,path,handler in routes.routes():
+        if method=="GET":
+            app.router.add_get(path,read_handler(handler))
+        else:
+            app.router.add_route(method,path,write_handler(handler))
+    return app
+
+
+def main():
+    parser=argparse.ArgumentParser()
+    parser.add_argument("--host",default="0.0.0.0")
+    parser.add_argument("--port",type=int,default=8080)
+    parser.add_argument("--db",default=None,help="SQLite file; in-memory storage when omitted")
+    parser.add_argument("--cache-ttl",type=float,default=1.0)
+    args=parser.parse_args()
+
+    storage=SQLiteStorage(args.db) if args.db else Storage()
+    routes=CarRoutes(CarMgmt(storage),args.cache_ttl)
+    web.run_app(build_app(routes),host=args.host,port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,3 @@
 from .carmgmt import CarMgmt
-from .storage import Storage
\ No newline at end of file
+from .storage import Storage
+from .sqlite_storage import SQLiteStorage
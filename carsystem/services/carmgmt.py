@@ -1,13 +1,18 @@
 from threading import Lock
 from models import Vendor , Buyer
+from .reservations import ReservationBook
 
 
 class CarMgmt:
-    def __init__(self,storage):
+    def __init__(self,storage,reservation_ttl=600):
         self.storage=storage 
         self.carlock=Lock()
         self.vendorlock=Lock()
         self.buyerlock=Lock()
+        # (carname, vendor_id) -> Lock, so purchases of different listings don't serialize
+        self.listinglocks={}
+        self.reservation_ttl=reservation_ttl
+        self.reservations=ReservationBook(self._release_reservation)
     
     def register_car(self,car):
         with self.carlock:
@@ -17,20 +22,100 @@ class CarMgmt:
         with self.vendorlock:
             v=Vendor(vendorName,id)
             self.storage.register_vendor(v)
+
+    def bulk_register_cars(self,cars):
+        """Registers an iterable of Car in one lock scope. Returns how many were read."""
+        with self.carlock:
+            return self.storage.save_cars(cars)
+
+    def bulk_register_vendors(self,vendors):
+        """Registers (vendorName, id) pairs, skipping ids already known. Returns how many were new."""
+        with self.vendorlock:
+            return self.storage.register_vendors(Vendor(vendorName,id) for vendorName,id in vendors)
+
+    def bulk_register_buyers(self,buyernames):
+        """Registers buyer names, skipping names already known. Returns how many were new."""
+        with self.buyerlock:
+            return self.storage.register_buyers(Buyer(buyername) for buyername in buyernames)
     
+    def _listinglock(self,carname,vendorname):
+        key=(carname,vendorname)
+        lock=self.listinglocks.get(key)
+        if lock is None:
+            lock=self.listinglocks.setdefault(key,Lock())
+        return lock
+
     def buy_car(self,carname,vendorname,buyername):
-        with self.carlock:
+        try:
+            car=self.storage.get_car(carname,vendorname)
+            buyer=self.storage.get_buyer(buyername)
+        except Exception as e:
+            print("unable to buy car. Exception:{}".format(e))
+            return False
+        with self._listinglock(carname,vendorname):
+            # reserve
+            if car.available_units-car.reserved_units<=0:
+                return False
+            car.available_units-=1
+            # commit, or hand the unit back
             try:
-                car=self.storage.get_car(carname,vendorname)
-                print("car:{}".format(car))
-                if car.available_units>0:
-                    car.available_units-=1 
-                    print("buyername:{}".format(vendorname))
-                    buyer=self.storage.get_buyer(buyername)
-                    self.storage.save_car(car)
-                    buyer.add_car(car.name)
+                self.storage.save_car(car)
             except Exception as e:
+                car.available_units+=1
                 print("unable to buy car. Exception:{}".format(e))
+                return False
+        self.storage.add_purchase(buyer,car)
+        return True
+
+    def reserve_car(self,carname,vendorname,buyername,ttl=None):
+        """
+        Holds one unit for `buyername` for `ttl` seconds (default reservation_ttl)
+        while checkout runs. Returns a reservation id, or None if nothing is free.
+        """
+        self.reservations.expire_due()
+        try:
+            car=self.storage.get_car(carname,vendorname)
+            self.storage.get_buyer(buyername)
+        except Exception as e:
+            print("unable to reserve car. Exception:{}".format(e))
+            return None
+        with self._listinglock(carname,vendorname):
+            if car.available_units-car.reserved_units<=0:
+                return None
+            car.reserved_units+=1
+        ttl=self.reservation_ttl if ttl is None else ttl
+        return self.reservations.add(carname,vendorname,buyername,ttl).reservation_id
+
+    def confirm_reservation(self,reservation_id):
+        """Turns a live hold into a purchase. Returns False if it expired or is unknown."""
+        reservation=self.reservations.pop(reservation_id)
+        if reservation is None:
+            return False
+        car=self.storage.get_car(reservation.carname,reservation.vendor_id)
+        buyer=self.storage.get_buyer(reservation.buyername)
+        with self._listinglock(reservation.carname,reservation.vendor_id):
+            car.reserved_units-=1
+            car.available_units-=1
+            try:
+                self.storage.save_car(car)
+            except Exception as e:
+                car.available_units+=1
+                print("unable to confirm reservation. Exception:{}".format(e))
+                return False
+        self.storage.add_purchase(buyer,car)
+        return True
+
+    def cancel_reservation(self,reservation_id):
+        reservation=self.reservations.pop(reservation_id)
+        if reservation is None:
+            return False
+        self._release_reservation(reservation)
+        return True
+
+    def _release_reservation(self,reservation):
+        car=self.storage.get_car(reservation.carname,reservation.vendor_id)
+        with self._listinglock(reservation.carname,reservation.vendor_id):
+            car.reserved_units-=1
 
     def register_buyer(self,buyername):
         with self.buyerlock:
@@ -0,0 +1,42 @@
+import csv
+import json
+from models import Car
+
+
+"""
+Readers for catalog files, for use with the CarMgmt.bulk_register_* methods.
+
+Every reader takes an open text stream and yields records lazily, so a file
+of any size is never held in memory at once. fmt is "csv" (with a header row)
+or "jsonl" (one JSON object per line).
+"""
+
+
+def read_records(stream,fmt="csv"):
+    if fmt=="csv":
+        yield from csv.DictReader(stream)
+    elif fmt=="jsonl":
+        for line in stream:
+            line=line.strip()
+            if line:
+                yield json.loads(line)
+    else:
+        raise ValueError("unknown catalog format:{}".format(fmt))
+
+
+def read_cars(stream,fmt="csv"):
+    """Columns: name, car_id, price, vendor_id, available_units."""
+    for record in read_records(stream,fmt):
+        yield Car(record["name"],str(record["car_id"]),str(record["price"]),str(record["vendor_id"]),int(record["available_units"]))
+
+
+def read_vendors(stream,fmt="csv"):
+    """Columns: name, id."""
+    for record in read_records(stream,fmt):
+        yield record["name"],str(record["id"])
+
+
+def read_buyers(stream,fmt="csv"):
+    """Column: name."""
+    for record in read_records(stream,fmt):
+        yield record["name"]
@@ -0,0 +1,82 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class Reservation:
+    __slots__=("reservation_id","carname","vendor_id","buyername","expires_at")
+
+    def __init__(self,reservation_id,carname,vendor_id,buyername,expires_at):
+        self.reservation_id=reservation_id
+        self.carname=carname
+        self.vendor_id=vendor_id
+        self.buyername=buyername
+        self.expires_at=expires_at
+
+
+class ReservationBook:
+    """
+    Open reservations and their deadlines.
+
+    Deadlines sit in one min-heap, so tracking a hold costs a slotted object
+    and a heap entry rather than a timer thread. Confirmed or cancelled holds
+    are left in the heap and skipped when they surface. expire_due() pops every
+    hold whose deadline has passed and hands it to `on_expire`; it is cheap
+    when nothing is due, so callers run it on every operation, and
+    start_sweeper() runs it periodically on a single background thread.
+    """
+
+    def __init__(self,on_expire,clock=time.monotonic):
+        self.on_expire=on_expire
+        self.clock=clock
+        self.lock=threading.Lock()
+        self.reservations={}
+        self.deadlines=[]
+        self.ids=itertools.count(1)
+        self.sweeper=None
+        self.stopped=threading.Event()
+
+    def add(self,carname,vendor_id,buyername,ttl):
+        with self.lock:
+            reservation=Reservation(next(self.ids),carname,vendor_id,buyername,self.clock()+ttl)
+            self.reservations[reservation.reservation_id]=reservation
+            heapq.heappush(self.deadlines,(reservation.expires_at,reservation.reservation_id))
+            return reservation
+
+    def pop(self,reservation_id):
+        """Removes and returns a live reservation, or None if unknown or expired."""
+        self.expire_due()
+        with self.lock:
+            return self.reservations.pop(reservation_id,None)
+
+    def expire_due(self):
+        now=self.clock()
+        expired=[]
+        with self.lock:
+            while self.deadlines and self.deadlines[0][0]<=now:
+                _,reservation_id=heapq.heappop(self.deadlines)
+                reservation=self.reservations.pop(reservation_id,None)
+                if reservation is not None:
+                    expired.append(reservation)
+        for reservation in expired:
+            self.on_expire(reservation)
+        return len(expired)
+
+    def __len__(self):
+        return len(self.reservations)
+
+    def start_sweeper(self,interval=1.0):
+        if self.sweeper is not None:
+            return
+        def sweep():
+            while not self.stopped.wait(interval):
+                self.expire_due()
+        self.sweeper=threading.Thread(target=sweep,name="reservation-sweeper",daemon=True)
+        self.sweeper.start()
+
+    def stop_sweeper(self):
+        self.stopped.set()
+        if self.sweeper is not None:
+            self.sweeper.join()
+            self.sweeper=None
@@ -0,0 +1,107 @@
+from threading import Lock
+from itertools import islice
+from models import Car,Buyer
+from storage import BaseStorage
+from dao.connection_pool import ConnectionPool
+from dao.car_dao import CarDao
+from dao.user_dao import UserDao
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    SQLite backed storage with a read-through cache.
+
+    Writes go to SQLite first and then to the cache. Reads are served from the
+    cache and fall back to SQLite on a miss, so a restarted process warms up
+    lazily. Cached cars are never evicted: CarMgmt mutates them in place under
+    a per-listing lock, so there must only ever be one object per listing.
+    """
+
+    def __init__(self,path,pool_size=4,batch_size=1000):
+        self.pool=ConnectionPool(path,pool_size)
+        self.cardao=CarDao(self.pool,batch_size)
+        self.userdao=UserDao(self.pool)
+        self.cachelock=Lock()
+        self.carcache={}
+        self.buyercache={}
+
+    def close(self):
+        self.pool.close()
+
+    def _cached_car(self,row):
+        name,car_id,price,vendor_id,available_units=row
+        key=(name,vendor_id)
+        car=self.carcache.get(key)
+        if car is None:
+            with self.cachelock:
+                car=self.carcache.setdefault(key,Car(name,car_id,price,vendor_id,available_units))
+        return car
+
+    def save_car(self,car):
+        self.cardao.upsert(car)
+        self.carcache[(car.name,car.vendor_id)]=car
+
+    def save_cars(self,cars):
+        """Writes cars a batch at a time and caches each batch once it is in SQLite."""
+        count=0
+        cars=iter(cars)
+        while True:
+            batch=[]
+            for car in islice(cars,self.cardao.batch_size):
+                float(car.price)
+                batch.append(car)
+            if not batch:
+                return count
+            self.cardao.upsert_many(batch)
+            for car in batch:
+                self.carcache[(car.name,car.vendor_id)]=car
+            count+=len(batch)
+
+    def get_car(self,carname,vendor_id):
+        car=self.carcache.get((carname,vendor_id))
+        if car is not None:
+            return car
+        row=self.cardao.get(carname,vendor_id)
+        if row is None:
+            raise ValueError("No car available with carname:{} and vendor_id:{}".format(carname,vendor_id))
+        return self._cached_car(row)
+
+    def get_cars_by_name(self,carname):
+        return [self._cached_car(row) for row in self.cardao.by_name(carname)]
+
+    def get_cars_by_vendor(self,vendor_id):
+        return [self._cached_car(row) for row in self.cardao.by_vendor(vendor_id)]
+
+    def get_cars_in_price_range(self,min_price,max_price):
+        return [self._cached_car(row) for row in self.cardao.price_range(min_price,max_price)]
+
+    def register_vendor(self,vendor):
+        self.register_vendors([vendor])
+
+    def register_vendors(self,vendors):
+        return self.userdao.insert_vendors((vendor.vendorName,vendor.id) for vendor in vendors)
+
+    def register_buyer(self,buyer):
+        self.register_buyers([buyer])
+
+    def register_buyers(self,buyers):
+        return self.userdao.insert_buyers(buyer.name for buyer in buyers)
+
+    def get_buyer(self,name):
+        buyer=self.buyercache.get(name)
+        if buyer is not None:
+            return buyer
+        row=self.userdao.get_buyer(name)
+        if row is None:
+            raise KeyError(name)
+        with self.cachelock:
+            buyer=self.buyercache.get(name)
+            if buyer is None:
+                buyer=Buyer(row[0])
+                buyer.carList.extend(row[1])
+                self.buyercache[name]=buyer
+        return buyer
+
+    def add_purchase(self,buyer,car):
+        self.userdao.insert_purchase(buyer.name,car.name)
+        buyer.add_car(car.name)
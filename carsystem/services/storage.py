@@ -1,43 +1,160 @@
 
 from threading import Lock
+from bisect import bisect_left,bisect_right
+from itertools import islice
+from storage import BaseStorage
 
 
-class Storage: 
+class Storage(BaseStorage):
     def __init__(self):
         self.storageLock=Lock()
         self.buyerList=[]
         self.vendorList=[]
         self.cardict={}
         self.buyerdict={}
-    
+        self.vendordict={}
+        # (carname, vendor_id) -> car
+        self.carindex={}
+        # vendor_id -> {carname: car}
+        self.vendorindex={}
+        # sorted (price, seq) keys with the matching cars, for range queries
+        self.pricekeys=[]
+        self.pricecars=[]
+        self.carprice={}
+        self.priceseq=0
+
     def save_car(self,car):
-        if car.name not in self.cardict:
-            self.cardict[car.name]=[]
-        self.cardict[car.name].append(car)
-    
+        with self.storageLock:
+            self._save_car(car,True)
+
+    def save_cars(self,cars,chunk_size=1000):
+        """
+        Saves many cars and rebuilds the price index once at the end.
+
+        Cars are read, price checked and deduplicated outside the lock, then
+        saved under it chunk_size at a time, so purchases keep going while a
+        long stream loads. Until the final rebuild, new listings can be found
+        by name and vendor but not by price. Rows read before a bad one are
+        kept; the rebuild runs even if reading fails.
+        """
+        count=0
+        cars=iter(cars)
+        try:
+            while True:
+                chunk={}
+                try:
+                    for car in islice(cars,chunk_size):
+                        float(car.price)
+                        chunk[(car.name,car.vendor_id)]=car
+                        count+=1
+                finally:
+                    if chunk:
+                        with self.storageLock:
+                            for car in chunk.values():
+                                self._save_car(car,False)
+                if not chunk:
+                    return count
+        finally:
+            with self.storageLock:
+                self._rebuild_price_index()
+
+    def _save_car(self,car,index_price):
+        # parsed before any index is touched, so a bad price leaves storage unchanged
+        price=float(car.price)
+        key=(car.name,car.vendor_id)
+        existing=self.carindex.get(key)
+        if existing is car and self.carprice.get(key,(None,))[0]==price:
+            # same listing object, only its unit count changed
+            return
+        if existing is None:
+            if car.name not in self.cardict:
+                self.cardict[car.name]=[]
+            self.cardict[car.name].append(car)
+        elif existing is not car:
+            carList=self.cardict[car.name]
+            carList[carList.index(existing)]=car
+        self.carindex[key]=car
+        self.vendorindex.setdefault(car.vendor_id,{})[car.name]=car
+        if index_price:
+            self._index_price(key,car,price)
+        # otherwise the caller rebuilds the price index; until then a save_car
+        # for this listing inserts a price entry of its own
+
+    def _rebuild_price_index(self):
+        entries=[]
+        for seq,(key,car) in enumerate(self.carindex.items(),1):
+            pricekey=(float(car.price),seq)
+            self.carprice[key]=pricekey
+            entries.append((pricekey,car))
+        entries.sort(key=lambda entry:entry[0])
+        self.pricekeys=[pricekey for pricekey,_ in entries]
+        self.pricecars=[car for _,car in entries]
+        self.priceseq=len(entries)
+
+    def _index_price(self,key,car,price):
+        old=self.carprice.get(key)
+        if old is not None:
+            if old[0]==price:
+                self.pricecars[bisect_left(self.pricekeys,old)]=car
+                return
+            position=bisect_left(self.pricekeys,old)
+            del self.pricekeys[position]
+            del self.pricecars[position]
+        self.priceseq+=1
+        pricekey=(price,self.priceseq)
+        position=bisect_right(self.pricekeys,pricekey)
+        self.pricekeys.insert(position,pricekey)
+        self.pricecars.insert(position,car)
+        self.carprice[key]=pricekey
+
     def get_buyer(self,name):
         return self.buyerdict[name]
-        
 
-    def get_car(self,carname,vendor_id):
-        print("yes get car")
-        for crn,carList in self.cardict.items():
-            print("crn:{} , carList:{}".format(crn,carList))
-            if carname==crn:
-                for car in carList:
-                    print("car name:{} , vendor_id:{} , vendor_id:{}".format(car.name, car.vendor_id,vendor_id))
-                    if car.vendor_id == vendor_id: 
-                        print("done bro")
-                        return car
 
+    def get_car(self,carname,vendor_id):
+        car=self.carindex.get((carname,vendor_id))
+        if car is not None:
+            return car
         raise ValueError("No car available with carname:{} and vendor_id:{}".format(carname,vendor_id))
-    
+
+    def get_cars_by_name(self,carname):
+        return list(self.cardict.get(carname,[]))
+
+    def get_cars_by_vendor(self,vendor_id):
+        return list(self.vendorindex.get(vendor_id,{}).values())
+
+    def get_cars_in_price_range(self,min_price,max_price):
+        min_key=(float(min_price),)
+        max_key=(float(max_price),float("inf"))
+        # writers insert into and replace the two lists one after the other
+        with self.storageLock:
+            low=bisect_left(self.pricekeys,min_key)
+            high=bisect_right(self.pricekeys,max_key)
+            return self.pricecars[low:high]
+
     def register_vendor(self,vendor):
-        if vendor not in self.vendorList:
+        if vendor.id not in self.vendordict:
             self.vendorList.append(vendor)
-    
+            self.vendordict[vendor.id]=vendor
+
     def register_buyer(self,buyer):
-        if buyer not in self.buyerList:
+        if buyer.name not in self.buyerdict:
             self.buyerList.append(buyer)
-        self.buyerdict[buyer.name]=buyer
-        
+            self.buyerdict[buyer.name]=buyer
+
+    def register_vendors(self,vendors):
+        with self.storageLock:
+            before=len(self.vendorList)
+            for vendor in vendors:
+                self.register_vendor(vendor)
+            return len(self.vendorList)-before
+
+    def register_buyers(self,buyers):
+        with self.storageLock:
+            before=len(self.buyerList)
+            for buyer in buyers:
+                self.register_buyer(buyer)
+            return len(self.buyerList)-before
+
+    def add_purchase(self,buyer,car):
+        buyer.add_car(car.name)
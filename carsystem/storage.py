@@ -0,0 +1,60 @@
+from abc import ABC,abstractmethod
+
+
+class BaseStorage(ABC):
+    """
+    What CarMgmt needs from a storage backend.
+
+    services.Storage keeps everything in memory; services.SQLiteStorage
+    persists to SQLite behind a read-through cache. Cars handed out by get_car
+    must be the same object for the same (carname, vendor_id) while the storage
+    lives, because CarMgmt updates them in place under a per-listing lock.
+    """
+
+    @abstractmethod
+    def save_car(self,car):
+        pass
+
+    @abstractmethod
+    def save_cars(self,cars):
+        pass
+
+    @abstractmethod
+    def get_car(self,carname,vendor_id):
+        pass
+
+    @abstractmethod
+    def get_cars_by_name(self,carname):
+        pass
+
+    @abstractmethod
+    def get_cars_by_vendor(self,vendor_id):
+        pass
+
+    @abstractmethod
+    def get_cars_in_price_range(self,min_price,max_price):
+        pass
+
+    @abstractmethod
+    def register_vendor(self,vendor):
+        pass
+
+    @abstractmethod
+    def register_vendors(self,vendors):
+        pass
+
+    @abstractmethod
+    def register_buyer(self,buyer):
+        pass
+
+    @abstractmethod
+    def register_buyers(self,buyers):
+        pass
+
+    @abstractmethod
+    def get_buyer(self,name):
+        pass
+
+    @abstractmethod
+    def add_purchase(self,buyer,car):
+        pass
@@ -1,6 +1,9 @@
 
 import unittest
+import threading
+import io
 from services import Storage , CarMgmt
+from services.catalog_loader import read_cars
 from models import Car
 
 class TestCarMgmt(unittest.TestCase):
@@ -16,4 +19,59 @@ class TestCarMgmt(unittest.TestCase):
     def test_available_units(self):
         carg=self.storage.get_car("nano","1")
         assert carg.available_units == 99
-        self.assertEqual(carg.available_units,99,"available units does not match")
\ No newline at end of file
+        self.assertEqual(carg.available_units,99,"available units does not match")
+
+    def test_concurrent_buy_does_not_oversell(self):
+        self.carmgmt.register_car(Car("swift","2","500","2",5))
+        threads=[threading.Thread(target=self.carmgmt.buy_car,args=("swift","2","sandeep")) for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.storage.get_car("swift","2").available_units,0)
+        self.assertEqual(self.storage.get_buyer("sandeep").getcarlist().count("swift"),5)
+
+    def test_buy_unknown_car(self):
+        self.assertFalse(self.carmgmt.buy_car("swift","9","sandeep"))
+
+class TestBulkRegistration(unittest.TestCase):
+    def setUp(self):
+        self.storage=Storage()
+        self.carmgmt=CarMgmt(self.storage)
+
+    def test_bulk_register_dedups(self):
+        self.assertEqual(self.carmgmt.bulk_register_buyers(["a","b","a"]),2)
+        self.assertEqual(self.carmgmt.bulk_register_buyers(["b","c"]),1)
+        self.assertEqual(self.carmgmt.bulk_register_vendors([("maruti","1"),("tata","2"),("maruti","1")]),2)
+        self.assertEqual(len(self.storage.buyerList),3)
+        self.assertEqual(len(self.storage.vendorList),2)
+
+    def test_bulk_register_cars_from_csv(self):
+        stream=io.StringIO("name,car_id,price,vendor_id,available_units\nnano,1,100,1,5\nswift,2,50,1,3\nnano,3,80,2,1\n")
+        self.assertEqual(self.carmgmt.bulk_register_cars(read_cars(stream)),3)
+        self.assertEqual(self.storage.get_car("swift","1").available_units,3)
+        self.assertEqual([car.car_id for car in self.storage.get_cars_in_price_range(0,100)],["2","3","1"])
+
+    def test_bulk_register_cars_from_jsonl(self):
+        stream=io.StringIO('{"name":"nano","car_id":1,"price":100,"vendor_id":1,"available_units":5}\n\n')
+        self.carmgmt.bulk_register_cars(read_cars(stream,"jsonl"))
+        self.assertEqual(self.storage.get_car("nano","1").price,"100")
+
+    def test_bad_row_keeps_price_index_consistent(self):
+        stream=io.StringIO("name,car_id,price,vendor_id,available_units\nnano,1,100,1,5\nswift,2,50,1,oops\n")
+        self.assertRaises(ValueError,self.carmgmt.bulk_register_cars,read_cars(stream))
+        car=self.storage.get_car("nano","1")
+        self.assertEqual(self.storage.get_cars_in_price_range(0,1000),[car])
+        self.carmgmt.register_buyer("a")
+        self.assertTrue(self.carmgmt.buy_car("nano","1","a"))
+        self.assertEqual(self.storage.get_cars_in_price_range(0,1000)[0].available_units,4)
+
+    def test_stream_is_read_outside_the_storage_lock(self):
+        locked=[]
+        def cars():
+            for i in range(2500):
+                locked.append(self.storage.storageLock.locked())
+                yield Car("car_{}".format(i),str(i),str(i),"1",1)
+        self.assertEqual(self.carmgmt.bulk_register_cars(cars()),2500)
+        self.assertFalse(any(locked))
+        self.assertEqual(len(self.storage.get_cars_in_price_range(0,10000)),2500)
@@ -0,0 +1,45 @@
+
+import unittest
+from services import Storage , CarMgmt
+from models import Car
+
+class FakeClock:
+    def __init__(self):
+        self.now=0.0
+
+    def __call__(self):
+        return self.now
+
+class TestReservations(unittest.TestCase):
+    def setUp(self):
+        self.storage=Storage()
+        self.carmgmt=CarMgmt(self.storage,reservation_ttl=10)
+        self.clock=FakeClock()
+        self.carmgmt.reservations.clock=self.clock
+        self.carmgmt.register_buyer("sandeep")
+        self.carmgmt.register_buyer("ajay")
+        self.carmgmt.register_car(Car("nano","1","100","1",1))
+
+    def test_reservation_blocks_other_buyers(self):
+        reservation_id=self.carmgmt.reserve_car("nano","1","sandeep")
+        self.assertIsNotNone(reservation_id)
+        self.assertIsNone(self.carmgmt.reserve_car("nano","1","ajay"))
+        self.assertFalse(self.carmgmt.buy_car("nano","1","ajay"))
+        self.assertTrue(self.carmgmt.confirm_reservation(reservation_id))
+        car=self.storage.get_car("nano","1")
+        self.assertEqual((car.available_units,car.reserved_units),(0,0))
+        self.assertEqual(self.storage.get_buyer("sandeep").getcarlist(),["nano"])
+
+    def test_cancel_releases_unit(self):
+        reservation_id=self.carmgmt.reserve_car("nano","1","sandeep")
+        self.assertTrue(self.carmgmt.cancel_reservation(reservation_id))
+        self.assertFalse(self.carmgmt.cancel_reservation(reservation_id))
+        self.assertTrue(self.carmgmt.buy_car("nano","1","ajay"))
+
+    def test_expired_reservation_cannot_be_confirmed(self):
+        reservation_id=self.carmgmt.reserve_car("nano","1","sandeep",ttl=5)
+        self.clock.now=5
+        self.assertFalse(self.carmgmt.confirm_reservation(reservation_id))
+        self.assertEqual(self.storage.get_car("nano","1").reserved_units,0)
+        self.assertEqual(len(self.carmgmt.reservations),0)
+        self.assertIsNotNone(self.carmgmt.reserve_car("nano","1","ajay"))
@@ -0,0 +1,50 @@
+
+import json
+import unittest
+from services import Storage , CarMgmt
+from routes.user_routes import CarRoutes
+
+class TestCarRoutes(unittest.TestCase):
+    def setUp(self):
+        self.routes=CarRoutes(CarMgmt(Storage()),cache_ttl=60)
+        self.routes.register_buyer({"name":"sandeep"})
+        self.routes.register_vendor({"name":"maruti","id":"1"})
+        self.routes.register_car({"name":"nano","car_id":"1","price":"100","vendor_id":"1","available_units":1})
+        self.routes.register_car({"name":"swift","car_id":"2","price":"500","vendor_id":"1","available_units":1})
+
+    def search(self,query):
+        status,body=self.routes.search(query)
+        return status,json.loads(body)
+
+    def test_search(self):
+        status,body=self.search({"min_price":"50","max_price":"200"})
+        self.assertEqual(status,200)
+        self.assertEqual([car["name"] for car in body["cars"]],["nano"])
+        self.assertEqual(self.search({"vendor_id":"1","max_price":"1000"})[1]["cars"][1]["name"],"swift")
+        self.assertEqual(self.search({"name":"city","vendor_id":"1"})[0],404)
+        self.assertEqual(self.search({"min_price":"cheap"})[0],400)
+
+    def test_search_is_cached_until_a_car_is_registered(self):
+        query={"vendor_id":"1"}
+        self.assertIsNone(self.routes.cached_search(query))
+        self.search(query)
+        self.assertIsNotNone(self.routes.cached_search(query))
+        self.routes.register_car({"name":"city","car_id":"3","price":"900","vendor_id":"1","available_units":1})
+        self.assertIsNone(self.routes.cached_search(query))
+        self.assertEqual(len(self.search(query)[1]["cars"]),3)
+
+    def test_purchase(self):
+        self.assertEqual(self.routes.purchase({"name":"nano","vendor_id":"1","buyer":"sandeep"})[0],200)
+        self.assertEqual(self.routes.purchase({"name":"nano","vendor_id":"1","buyer":"sandeep"})[0],409)
+        self.assertEqual(self.routes.purchase({"name":"nano"})[0],400)
+
+    def test_register_car_rejects_bad_price(self):
+        self.assertEqual(self.routes.register_car({"name":"alto","car_id":"3","price":"abc","vendor_id":"1","available_units":1})[0],400)
+        self.assertEqual(len(self.search({"vendor_id":"1"})[1]["cars"]),2)
+
+    def test_search_by_name(self):
+        self.routes.register_vendor({"name":"tata","id":"2"})
+        self.routes.register_car({"name":"nano","car_id":"3","price":"90","vendor_id":"2","available_units":1})
+        status,body=self.search({"name":"nano"})
+        self.assertEqual(sorted(car["vendor_id"] for car in body["cars"]),["1","2"])
+        self.assertEqual(self.search({"name":"nano","max_price":"95"})[1]["cars"][0]["vendor_id"],"2")
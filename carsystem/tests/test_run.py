@@ -0,0 +1,33 @@
+import json
+import unittest
+from aiohttp.test_utils import TestClient,TestServer
+from services import Storage , CarMgmt
+from routes.user_routes import CarRoutes
+from scripts.run import build_app
+
+class TestRunApp(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        routes=CarRoutes(CarMgmt(Storage()),cache_ttl=60)
+        self.client=TestClient(TestServer(build_app(routes)))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_register_and_search(self):
+        response=await self.client.post("/vendors",json={"name":"maruti","id":"1"})
+        self.assertEqual(response.status,201)
+        car={"name":"nano","car_id":"1","price":"100","vendor_id":"1","available_units":1}
+        self.assertEqual((await self.client.post("/cars",json=car)).status,201)
+        response=await self.client.get("/cars",params={"max_price":"200"})
+        self.assertEqual(response.status,200)
+        self.assertEqual([car["name"] for car in json.loads(await response.text())["cars"]],["nano"])
+
+    async def test_bad_bodies_are_400(self):
+        for body in (b"{not json",b"\xff\xfe{}"):
+            response=await self.client.post("/buyers",data=body,headers={"Content-Type":"application/json"})
+            self.assertEqual(response.status,400,body)
+            self.assertEqual(json.loads(await response.text()),{"error":"body must be JSON"})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+
+import os
+import shutil
+import tempfile
+import unittest
+from services import SQLiteStorage , CarMgmt
+from models import Car
+
+class TestSQLiteStorage(unittest.TestCase):
+    def setUp(self):
+        self.dir=tempfile.mkdtemp()
+        self.path=os.path.join(self.dir,"cars.db")
+        self.storage=SQLiteStorage(self.path)
+        self.carmgmt=CarMgmt(self.storage)
+        self.carmgmt.register_buyer("sandeep")
+        self.carmgmt.register_vendor("maruti","1")
+        self.carmgmt.bulk_register_cars([Car("nano","1","100","1",2),Car("swift","2","500","1",1),Car("city","3","900","2",1)])
+
+    def tearDown(self):
+        self.storage.close()
+        shutil.rmtree(self.dir)
+
+    def test_state_survives_restart(self):
+        self.assertTrue(self.carmgmt.buy_car("nano","1","sandeep"))
+        self.storage.close()
+        self.storage=SQLiteStorage(self.path)
+        self.assertEqual(self.storage.get_car("nano","1").available_units,1)
+        self.assertEqual(self.storage.get_buyer("sandeep").getcarlist(),["nano"])
+
+    def test_reads_return_cached_listing(self):
+        car=self.storage.get_car("swift","1")
+        cars={c.name:c for c in self.storage.get_cars_by_vendor("1")}
+        self.assertIs(cars["swift"],car)
+        self.assertEqual(self.storage.get_cars_by_name("swift"),[car])
+        self.assertEqual([c.name for c in self.storage.get_cars_in_price_range(100,500)],["nano","swift"])
+        self.assertRaises(ValueError,self.storage.get_car,"nano","9")
+
+    def test_sold_out(self):
+        self.assertTrue(self.carmgmt.buy_car("swift","1","sandeep"))
+        self.assertFalse(self.carmgmt.buy_car("swift","1","sandeep"))
+        self.assertEqual(self.storage.get_car("swift","1").available_units,0)
+
+    def test_register_dedups(self):
+        self.assertEqual(self.carmgmt.bulk_register_buyers(["sandeep","ajay"]),1)
+        self.assertEqual(self.carmgmt.bulk_register_vendors([("maruti","1"),("tata","2")]),1)
@@ -0,0 +1,64 @@
+
+import threading
+import unittest
+from services import Storage
+from models import Car
+
+class TestStorage(unittest.TestCase):
+    def setUp(self):
+        self.storage=Storage()
+        self.storage.save_car(Car("nano","1","100","1",10))
+        self.storage.save_car(Car("nano","2","150","2",10))
+        self.storage.save_car(Car("swift","3","500","1",10))
+        self.storage.save_car(Car("city","4","900","3",10))
+
+    def test_get_car(self):
+        car=self.storage.get_car("nano","2")
+        self.assertEqual(car.car_id,"2")
+        self.assertRaises(ValueError,self.storage.get_car,"nano","3")
+
+    def test_save_car_replaces_existing_listing(self):
+        car=self.storage.get_car("nano","1")
+        car.available_units-=1
+        self.storage.save_car(car)
+        self.assertEqual(len(self.storage.cardict["nano"]),2)
+        self.assertEqual(len(self.storage.get_cars_in_price_range(0,1000)),4)
+
+    def test_get_cars_by_vendor(self):
+        names=sorted(car.name for car in self.storage.get_cars_by_vendor("1"))
+        self.assertEqual(names,["nano","swift"])
+        self.assertEqual(self.storage.get_cars_by_vendor("9"),[])
+
+    def test_get_cars_in_price_range(self):
+        names=[car.car_id for car in self.storage.get_cars_in_price_range(100,500)]
+        self.assertEqual(names,["1","2","3"])
+
+    def test_price_change_moves_listing(self):
+        self.storage.save_car(Car("nano","5","1000","1",10))
+        self.assertEqual([car.car_id for car in self.storage.get_cars_in_price_range(600,2000)],["4","5"])
+        self.assertEqual(self.storage.get_cars_in_price_range(100,100),[])
+
+    def test_bad_price_leaves_storage_unchanged(self):
+        self.assertRaises(ValueError,self.storage.save_car,Car("alto","6","abc","1",10))
+        self.assertRaises(ValueError,self.storage.get_car,"alto","1")
+        self.assertEqual(sorted(car.name for car in self.storage.get_cars_by_vendor("1")),["nano","swift"])
+        self.assertNotIn("alto",self.storage.cardict)
+
+    def test_price_range_waits_for_index_update(self):
+        storage=self.storage
+        seen=[]
+
+        class PauseAfterInsert(list):
+            # runs a range query from another thread between the key and car inserts
+            def insert(self,position,key):
+                super().insert(position,key)
+                self.reader=threading.Thread(target=lambda:seen.append(storage.get_cars_in_price_range(0,1000)))
+                self.reader.start()
+                self.reader.join(0.1)
+                seen.append("reader blocked" if self.reader.is_alive() else "reader done")
+
+        storage.pricekeys=PauseAfterInsert(storage.pricekeys)
+        storage.save_car(Car("alto","6","300","1",10))
+        storage.pricekeys.reader.join(5)
+        self.assertEqual(seen[0],"reader blocked")
+        self.assertEqual([car.car_id for car in seen[1]],["1","2","6","3","4"])
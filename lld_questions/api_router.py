@@ -1,5 +1,77 @@
-import threading 
-from flask import Flask,jsonify,request
+import threading
+import argparse
+import hashlib
+import json
+import unittest
+from flask import Flask,Response,jsonify,request
+
+
+class Inventory:
+    """
+    Products with one lock each, so stock updates to different products never
+    wait on each other. A batch update locks its products in sorted order (no
+    deadlock between overlapping batches) and applies all changes or none.
+
+    Each product's JSON is encoded once and kept with its ETag until an update
+    touches that product, so reads only look up bytes.
+    """
+
+    def __init__(self,products,stock_field="age"):
+        self.products=products
+        self.stock_field=stock_field
+        self.locks={product_id:threading.Lock() for product_id in products}
+        self.encoded={}
+
+    def get(self,product_id):
+        return self.products.get(product_id)
+
+    def get_encoded(self,product_id):
+        """(etag, JSON bytes) for a product, or None if it does not exist."""
+        entry=self.encoded.get(product_id)
+        if entry is not None:
+            return entry
+        lock=self.locks.get(product_id)
+        if lock is None:
+            return None
+        with lock:
+            # encoded under the product lock, so an update cannot slip in between
+            body=json.dumps(self.products[product_id],separators=(",",":"),sort_keys=True).encode()
+            entry=(hashlib.blake2b(body,digest_size=8).hexdigest(),body)
+            self.encoded[product_id]=entry
+        return entry
+
+    def update_stock(self,product_id,change):
+        lock=self.locks.get(product_id)
+        if lock is None:
+            return None
+        with lock:
+            product=self.products[product_id]
+            product[self.stock_field]+=change
+            self.encoded.pop(product_id,None)
+            return product[self.stock_field]
+
+    def update_stocks(self,changes):
+        """changes: {product_id: change}. Returns the new stock levels, or None if any product is unknown."""
+        if any(product_id not in self.locks for product_id in changes):
+            return None
+        product_ids=sorted(changes)
+        for product_id in product_ids:
+            self.locks[product_id].acquire()
+        try:
+            stocks={}
+            for product_id in product_ids:
+                product=self.products[product_id]
+                product[self.stock_field]+=changes[product_id]
+                stocks[product_id]=product[self.stock_field]
+                self.encoded.pop(product_id,None)
+            return stocks
+        finally:
+            for product_id in reversed(product_ids):
+                self.locks[product_id].release()
+
+
+def valid_change(change):
+    return isinstance(change,int) and not isinstance(change,bool)
 
 
 app=Flask(__name__)
@@ -8,26 +80,120 @@ inventory={
     "product_2":{"nane":"ajay","age":6378},
 
 }
+stock=Inventory(inventory)
+
 
-lock=threading.Lock()
 @app.route('/products/<product_id>',methods=["GET"])
 def get_product(product_id):
-    if product_id in inventory:
-        return jsonify(inventory[product_id])
-    return jsonify({"error":"product not fond"}),400
+    entry=stock.get_encoded(product_id)
+    if entry is None:
+        return jsonify({"error":"product not fond"}),400
+    etag,body=entry
+    # no-cache: clients may keep the body but must revalidate, which is a 304 until the stock changes
+    headers={"ETag":'"{}"'.format(etag),"Cache-Control":"no-cache"}
+    if request.if_none_match.contains(etag):
+        return Response(status=304,headers=headers)
+    return Response(body,mimetype="application/json",headers=headers)
 
 
-@app.route("/products/<product_id>/stocks",methods=["UPDATE"])
+# UPDATE is kept for existing clients; PATCH is the standard verb
+@app.route("/products/<product_id>/stocks",methods=["UPDATE","PATCH"])
 def update(product_id):
-    data=request.get_json()
-    quantity_change=data["change"]
-    if product_id in inventory and isinstance(quantity_change):
-        with lock:
-            inventory[product_id]["age"]+=quantity_change
-            return jsonify({"message":"successful"})
-    else:
+    data=request.get_json(silent=True) or {}
+    quantity_change=data.get("change")
+    if not valid_change(quantity_change):
+        return jsonify({"error":"change must be an integer"}),400
+    if stock.update_stock(product_id,quantity_change) is None:
         return jsonify({"error":"product not found"}),400
-    
+    return jsonify({"message":"successful"})
+
+
+@app.route("/products/stocks",methods=["POST"])
+def update_batch():
+    """Body: {"changes": {"product_1": 5, "product_2": -1}}, applied atomically."""
+    data=request.get_json(silent=True) or {}
+    changes=data.get("changes")
+    if not isinstance(changes,dict) or not all(valid_change(change) for change in changes.values()):
+        return jsonify({"error":"changes must map product ids to integers"}),400
+    stocks=stock.update_stocks(changes)
+    if stocks is None:
+        return jsonify({"error":"product not found"}),400
+    return jsonify({"message":"successful","stocks":stocks})
+
+
+def serve(host="0.0.0.0",port=5003,threads=16):
+    """
+    Serves the app on waitress with `threads` worker threads in one process.
+    The inventory lives in process memory, so it is not forked into several
+    processes. Falls back to werkzeug's threaded server without waitress.
+    """
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        print("waitress not installed, using the threaded werkzeug server")
+        app.run(host=host,port=port,threaded=True)
+        return
+    waitress_serve(app,host=host,port=port,threads=threads,connection_limit=max(100,threads*8))
+
+
+class TestInventory(unittest.TestCase):
+    def testconcurrentupdates(self):
+        products=Inventory({"a":{"age":0},"b":{"age":0}})
+
+        def worker():
+            for _ in range(1000):
+                products.update_stock("a",1)
+                products.update_stocks({"a":1,"b":-1})
+
+        threads=[threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(products.get("a")["age"],16000)
+        self.assertEqual(products.get("b")["age"],-8000)
+
+    def testunknownproduct(self):
+        products=Inventory({"a":{"age":1}})
+        self.assertIsNone(products.update_stock("x",1))
+        self.assertIsNone(products.update_stocks({"a":1,"x":1}))
+        self.assertEqual(products.get("a")["age"],1)
+
+    def testroutes(self):
+        client=app.test_client()
+        before=inventory["product_1"]["age"]
+        self.assertEqual(client.open("/products/product_1/stocks",method="UPDATE",json={"change":2}).status_code,200)
+        self.assertEqual(client.patch("/products/product_1/stocks",json={"change":"2"}).status_code,400)
+        response=client.post("/products/stocks",json={"changes":{"product_1":-2,"product_2":0}})
+        self.assertEqual(response.get_json()["stocks"]["product_1"],before)
+        self.assertEqual(client.post("/products/stocks",json={"changes":{"nope":1}}).status_code,400)
+
+    def testetag(self):
+        client=app.test_client()
+        response=client.get("/products/product_2")
+        etag=response.headers["ETag"]
+        self.assertEqual(response.get_json(),inventory["product_2"])
+        self.assertEqual(client.get("/products/product_2",headers={"If-None-Match":etag}).status_code,304)
+        client.patch("/products/product_2/stocks",json={"change":1})
+        response=client.get("/products/product_2",headers={"If-None-Match":etag})
+        self.assertEqual(response.status_code,200)
+        self.assertEqual(response.get_json()["age"],inventory["product_2"]["age"])
+        client.patch("/products/product_2/stocks",json={"change":-1})
+        self.assertEqual(client.get("/products/product_2").headers["ETag"],etag)
+
+
+def main(argv=None):
+    parser=argparse.ArgumentParser()
+    parser.add_argument("--host",default="0.0.0.0")
+    parser.add_argument("--port",type=int,default=5003)
+    parser.add_argument("--threads",type=int,default=16)
+    parser.add_argument("--debug",action="store_true",help="flask debug server")
+    args=parser.parse_args(argv)
+    if args.debug:
+        app.run(debug=True,host=args.host,port=args.port)
+    else:
+        serve(args.host,args.port,args.threads)
+
 
 if __name__ == "__main__":
-    app.run(debug=True, host='0.0.0.0', port=5003)  # Run on all interfaces, port 5001
+    main()
@@ -1,27 +1,82 @@
-
-
-
 import threading
-from collections import deque
+from collections import OrderedDict,deque
+from collections.abc import Mapping
 import time
 import unittest
 
+
+class _Shard:
+    __slots__=('lock','users')
+
+    def __init__(self):
+        self.lock=threading.Lock()
+        # user_id -> deque of request times, least recently active first
+        self.users=OrderedDict()
+
+
+class _UserRequests(Mapping):
+    """Read-only user_id -> request times view across all shards."""
+
+    def __init__(self,limiter):
+        self.limiter=limiter
+
+    def __getitem__(self,user_id):
+        return self.limiter._shard(user_id).users[user_id]
+
+    def __iter__(self):
+        for shard in self.limiter.shards:
+            yield from list(shard.users)
+
+    def __len__(self):
+        return sum(len(shard.users) for shard in self.limiter.shards)
+
+
 class RateLimiter:
-    def __init__(self,limit,window_second):
+    """
+    Sliding window limiter: at most `limit` requests per user in any
+    `window_second` seconds.
+
+    Users are spread over `shards` by hash, each shard with its own lock, so
+    requests for different users rarely contend. A user's history is a deque
+    of at most `limit` times, and a user with no request inside the window is
+    dropped (each call sweeps the idle users at the front of its shard), so
+    memory follows the users active in the last window rather than every user
+    ever seen. `max_users_per_shard` caps it outright: past it the least
+    recently active user is dropped even if still in the window, which can
+    only let that user through early, never block anyone wrongly.
+    """
+
+    def __init__(self,limit,window_second,shards=64,max_users_per_shard=100000,clock=time.monotonic):
         self.limit=limit 
         self.window_second=window_second
-        self.user_request={}
-        self.lock=threading.Lock()
-    
+        self.shards=[_Shard() for _ in range(shards)]
+        self.max_users_per_shard=max_users_per_shard
+        self.clock=clock
+        self.user_request=_UserRequests(self)
+
+    def _shard(self,user_id):
+        return self.shards[hash(user_id)%len(self.shards)]
+
     def allow_request(self,user_id):
-        
-        with self.lock:
-            if user_id not in self.user_request:
-                self.user_request[user_id]=deque()
-
-            user_queue=self.user_request[user_id]
-            current_time=time.time()
-            while user_queue and user_queue[0]<current_time - self.window_second:
+        shard=self._shard(user_id)
+        with shard.lock:
+            current_time=self.clock()
+            start=current_time-self.window_second
+            users=shard.users
+            while users:
+                oldest_user,oldest_queue=next(iter(users.items()))
+                if oldest_queue and oldest_queue[-1]>=start:
+                    break
+                del users[oldest_user]
+
+            user_queue=users.get(user_id)
+            if user_queue is None:
+                if len(users)>=self.max_users_per_shard:
+                    users.popitem(last=False)
+                user_queue=users[user_id]=deque(maxlen=self.limit)
+            else:
+                users.move_to_end(user_id)
+            while user_queue and user_queue[0]<start:
                 user_queue.popleft()
             
             if len(user_queue)<self.limit:
@@ -56,6 +111,28 @@ class TestRateLimiter(unittest.TestCase):
         run_request()
         self.assertTrue(len(rate_limiter.user_request[user_id])<=rate_limiter.limit)
 
+    def testidleusersevicted(self):
+        now=[0.0]
+        limiter=RateLimiter(2,10,shards=4,clock=lambda:now[0])
+        for i in range(1000):
+            self.assertTrue(limiter.allow_request("user_{}".format(i)))
+        self.assertTrue(limiter.allow_request("user_0"))
+        self.assertFalse(limiter.allow_request("user_0"))
+        self.assertEqual(len(limiter.user_request),1000)
+        now[0]=11.0
+        # enough new users to reach every shard and sweep it
+        for i in range(100):
+            limiter.allow_request("late_{}".format(i))
+        self.assertTrue(all(user.startswith("late_") for user in limiter.user_request))
+        self.assertTrue(limiter.allow_request("user_0"))
+
+    def testmaxusers(self):
+        limiter=RateLimiter(1,60,shards=1,max_users_per_shard=10)
+        for i in range(100):
+            limiter.allow_request(i)
+        self.assertEqual(len(limiter.user_request),10)
+        self.assertFalse(limiter.allow_request(99))
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file